@@ -0,0 +1,161 @@
+from verto.Verto import Verto
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+
+DEFAULT_MAX_CONCURRENCY = 4
+
+
+class AsyncVerto(object):
+    '''An asyncio interface to a Verto converter, which runs conversions
+    on a pool of threads so the event loop is not blocked.
+    '''
+
+    def __init__(self, converter=None, max_concurrency=DEFAULT_MAX_CONCURRENCY, executor=None):
+        '''Creates an AsyncVerto object.
+
+        Args:
+            converter: The Verto converter to convert documents with. If
+                not given, a Verto converter with the default
+                configuration is created.
+            max_concurrency: The maximum number of documents converted
+                at the same time, on either executor.
+            executor: A concurrent.futures executor to run conversions
+                on. If not given, a thread pool with max_concurrency
+                threads is created, and shut down by close().
+        '''
+        if max_concurrency < 1:
+            raise ValueError('max_concurrency must be at least 1.')
+        self.converter = converter if converter is not None else Verto()
+        self.max_concurrency = max_concurrency
+        self.owns_executor = executor is None
+        self.executor = executor if executor is not None else ThreadPoolExecutor(max_workers=max_concurrency)
+        self._semaphore = None
+        self._semaphore_loop = None
+
+    async def __aenter__(self):
+        '''Returns this object for use in an async with statement.'''
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        '''Closes this object without blocking the event loop.'''
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+    def close(self):
+        '''Shuts down the executor if it was created by this object.
+        Conversions that are already running are finished first.
+        '''
+        if self.owns_executor:
+            self.executor.shutdown(wait=True)
+
+    async def convert(self, text, timeout=None):
+        '''Return a VertoResult object after converting the given
+        markdown string.
+
+        If the call is cancelled or times out, the document is not
+        added to the data saved between documents. A conversion that
+        has already started on a thread still runs to the end, but its
+        result is discarded, and it counts towards max_concurrency
+        until it ends.
+
+        Args:
+            text: A string of Markdown text to be converted.
+            timeout: The number of seconds to wait for the conversion,
+                including time spent waiting for a free slot. Waits
+                forever if None.
+        Returns:
+            A VertoResult object.
+        Raises:
+            asyncio.TimeoutError: If the conversion did not finish
+                within the timeout.
+        '''
+        if timeout is None:
+            return await self._convert(text)
+        return await asyncio.wait_for(self._convert(text), timeout)
+
+    async def convert_many(self, texts, timeout=None):
+        '''Return a list of VertoResult objects after converting each of
+        the given markdown strings concurrently.
+
+        Args:
+            texts: An iterable of strings of Markdown text.
+            timeout: The number of seconds to wait for each conversion.
+                Waits forever if None.
+        Returns:
+            A list of VertoResult objects in the same order as the
+            given texts.
+        '''
+        return await asyncio.gather(*[self.convert(text, timeout) for text in texts])
+
+    async def as_completed(self, texts, timeout=None):
+        '''Converts each of the given markdown strings concurrently,
+        yielding results in the order they finish. Conversions not yet
+        finished are cancelled if the generator is closed early.
+
+        Args:
+            texts: An iterable of strings of Markdown text.
+            timeout: The number of seconds to wait for each conversion.
+                Waits forever if None.
+        Yields:
+            Tuples of the index of the text and its VertoResult object.
+        '''
+        tasks = {}
+        for index, text in enumerate(texts):
+            tasks[asyncio.ensure_future(self.convert(text, timeout))] = index
+        try:
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=tasks.get):
+                    yield tasks[task], task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _convert(self, text):
+        '''Converts the given text on the executor once a slot is free.
+        The slot is held until the conversion ends on the executor, even
+        if the call is cancelled or times out before then.
+
+        Args:
+            text: A string of Markdown text to be converted.
+        Returns:
+            A VertoResult object.
+        '''
+        semaphore = self._get_semaphore()
+        await semaphore.acquire()
+        loop = asyncio.get_running_loop()
+        converter = self.converter
+        verto_extension = converter.verto_extension
+        try:
+            context = verto_extension.create_context()
+            future = self.executor.submit(converter._convert, text, context)
+        except BaseException:
+            semaphore.release()
+            raise
+        future.add_done_callback(lambda future: self._release_slot(loop, semaphore))
+        html_string = await asyncio.wrap_future(future)
+        return converter._create_result(verto_extension, context, html_string)
+
+    @staticmethod
+    def _release_slot(loop, semaphore):
+        '''Releases the slot of a conversion from the thread it ended
+        on.
+
+        Args:
+            loop: The event loop of the semaphore.
+            semaphore: The semaphore limiting concurrent conversions.
+        '''
+        try:
+            loop.call_soon_threadsafe(semaphore.release)
+        except RuntimeError:
+            pass  # The event loop is closed, and the semaphore with it
+
+    def _get_semaphore(self):
+        '''Returns the semaphore limiting concurrent conversions on the
+        running event loop.
+        '''
+        loop = asyncio.get_running_loop()
+        if self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
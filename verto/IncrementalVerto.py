@@ -0,0 +1,276 @@
+from verto.Verto import Verto, VertoResult
+from verto.processors.HeadingBlockProcessor import LevelGenerator
+from verto.utils.ConversionContext import ConversionContext
+from verto.utils.DocumentSplitter import DocumentSplitter, supports_segments
+from verto.utils.HeadingNode import DynamicHeadingNode
+from collections import defaultdict
+
+MAX_HEADING_LEVELS = 6
+
+
+class IncrementalVerto(object):
+    ''' Converts successive revisions of a document, only converting
+    the parts of the document that changed since the previous revision.
+
+    The document is split into segments (see DocumentSplitter), and the
+    output of each segment is kept with the state it depended on when
+    converted: the heading levels before it, and the slugs it checked
+    were taken. A segment is reused when its text is unchanged and the
+    state it depended on is the same, so heading numbers and slugs are
+    only recomputed for segments they affect.
+
+    Results are not added to the data saved by the converter, as each
+    revision replaces the previous one, but slugs saved by the converter
+    are treated as taken.
+    '''
+
+    def __init__(self, converter=None):
+        '''
+        Args:
+            converter: The Verto converter to convert segments with. If
+                not given, a Verto converter with the default
+                configuration is created.
+        '''
+        self.converter = converter if converter is not None else Verto()
+        self.splitter = None
+        self.fingerprint = None
+        self.segments = {}
+        self.converted_segments = 0
+        self.reused_segments = 0
+
+    def reset(self):
+        '''Forgets the segments of the previous revision.'''
+        self.segments = {}
+
+    def convert(self, text):
+        '''Return a VertoResult object after converting the given
+        revision of the document.
+
+        Args:
+            text: A string of Markdown text to be converted.
+        Returns:
+            A VertoResult object.
+        '''
+        verto_extension = self.converter.verto_extension
+        fingerprint = self.converter.configuration_fingerprint()
+        if self.fingerprint != fingerprint:
+            # The converter was reconfigured, so previous output is stale
+            self.reset()
+            self.fingerprint = fingerprint
+            self.splitter = DocumentSplitter(verto_extension.processor_info, verto_extension.processors)
+
+        if self.supports_segments():
+            segment_texts, references = self.splitter.split(text)
+        else:
+            segment_texts, references = [text], ''
+
+        with verto_extension.lock:
+            taken_slugs = set(verto_extension.saved_context.custom_slugify.uids)
+        levels = (0, ) * MAX_HEADING_LEVELS
+        segments = {}
+        outputs = []
+        self.converted_segments = 0
+        self.reused_segments = 0
+
+        for index, segment_text in enumerate(segment_texts):
+            if references:
+                segment_text = segment_text + '\n\n' + references
+            document_start = index == 0
+            document_end = index == len(segment_texts) - 1
+            key = (segment_text, document_start, document_end)
+            segment = self.find_segment(self.segments.get(key, []), levels, taken_slugs)
+            if segment is None:
+                segment = self.convert_segment(segment_text, document_start, document_end, levels, taken_slugs)
+                self.converted_segments += 1
+            else:
+                self.reused_segments += 1
+            segments.setdefault(key, []).append(segment)
+            outputs.append(segment)
+            taken_slugs.update(segment.slugs)
+            levels = segment.levels_out if segment.levels_out is not None else levels
+        self.segments = segments
+
+        required_files = defaultdict(set)
+        for file_type, files in ConversionContext().required_files.items():
+            required_files[file_type] = set(files)
+        glossary_terms = defaultdict(list)
+        headings = []
+        for segment in outputs:
+            for file_type, files in segment.required_files.items():
+                required_files[file_type].update(files)
+            for term, references in segment.glossary_terms.items():
+                glossary_terms[term].extend(references)
+            headings.extend(segment.headings)
+
+        return VertoResult(
+            html_string=''.join(segment.html_string for segment in outputs),
+            title=outputs[0].title,
+            required_files=required_files,
+            heading_tree=build_heading_tree(headings),
+            required_glossary_terms=glossary_terms
+        )
+
+    def supports_segments(self):
+        '''
+        Returns:
+            False if an extension of the converter needs the whole
+            document to be converted at once, otherwise True.
+        '''
+        return supports_segments(self.converter.extensions)
+
+    def find_segment(self, segments, levels, taken_slugs):
+        '''
+        Args:
+            segments: A list of previously converted Segments with the
+                same text.
+            levels: A tuple of the heading levels before the segment.
+            taken_slugs: A set of slugs used before the segment.
+        Returns:
+            A Segment which can be reused, otherwise None.
+        '''
+        for segment in segments:
+            if segment.levels_in is not None and segment.levels_in != levels:
+                continue
+            if all((slug in taken_slugs) == taken for slug, taken in segment.slug_lookups.items()):
+                return segment
+        return None
+
+    def convert_segment(self, text, document_start, document_end, levels, taken_slugs):
+        '''
+        Args:
+            text: A string of Markdown text of the segment.
+            document_start: True if the segment is the start of the
+                document.
+            document_end: True if the segment is the end of the
+                document.
+            levels: A tuple of the heading levels before the segment.
+            taken_slugs: A set of slugs used before the segment.
+        Returns:
+            A new Segment.
+        '''
+        verto_extension = self.converter.verto_extension
+        slug_lookups = SlugLookups(taken_slugs)
+        custom_slugify = verto_extension.saved_context.custom_slugify.spawn()
+        custom_slugify.parent = slug_lookups
+        context = ConversionContext(custom_slugify=custom_slugify)
+        context.document_start = document_start
+        context.level_generator = LevelGenerator(MAX_HEADING_LEVELS)
+        context.level_generator.level_list = list(levels)
+
+        html_string = self.converter._convert_segment(text, context, document_end)
+
+        levels_out = tuple(context.level_generator.level_list)
+        return Segment(
+            html_string=html_string,
+            title=context.title,
+            headings=flatten_heading_tree(context.heading_tree),
+            slugs=set(custom_slugify.uids),
+            required_files=context.required_files,
+            glossary_terms=context.glossary_terms,
+            levels_in=levels if levels_out != levels else None,
+            levels_out=levels_out if levels_out != levels else None,
+            slug_lookups=slug_lookups.lookups,
+        )
+
+
+class Segment(object):
+    ''' The output of a converted segment, and the state it depended on.
+    '''
+
+    def __init__(self, html_string, title, headings, slugs, required_files, glossary_terms,
+                 levels_in, levels_out, slug_lookups):
+        '''
+        Args:
+            html_string: A string of the HTML of the segment, including
+                the whitespace before the next segment.
+            title: The title found in the segment, or None.
+            headings: A list of tuples of the title, slug and level of
+                each heading in the segment.
+            slugs: A set of the slugs created by the segment.
+            required_files: Dictionary of required file types to sets
+                of paths.
+            glossary_terms: A dictionary of glossary terms to a list of
+                tuples containing reference text and slugs.
+            levels_in: A tuple of the heading levels the segment
+                depended on, or None if it has no headings.
+            levels_out: A tuple of the heading levels after the segment,
+                or None if it has no headings.
+            slug_lookups: A dictionary of slugs checked by the segment
+                to whether they were taken.
+        '''
+        self.html_string = html_string
+        self.title = title
+        self.headings = headings
+        self.slugs = slugs
+        self.required_files = required_files
+        self.glossary_terms = glossary_terms
+        self.levels_in = levels_in
+        self.levels_out = levels_out
+        self.slug_lookups = slug_lookups
+
+
+class SlugLookups(object):
+    ''' A set of taken slugs, which records each slug checked against it.
+    '''
+
+    def __init__(self, slugs):
+        '''
+        Args:
+            slugs: A set of strings of taken slugs.
+        '''
+        self.slugs = slugs
+        self.lookups = {}
+
+    def __contains__(self, slug):
+        '''
+        Args:
+            slug: A string of a slug.
+        Returns:
+            True if the slug is taken.
+        '''
+        taken = slug in self.slugs
+        self.lookups[slug] = taken
+        return taken
+
+
+def flatten_heading_tree(heading_tree):
+    '''
+    Args:
+        heading_tree: A tuple of HeadingNodes, or None.
+    Returns:
+        A list of tuples of the title, slug and level of each heading,
+        in document order.
+    '''
+    headings = []
+    stack = list(reversed(heading_tree or ()))
+    while stack:
+        node = stack.pop()
+        headings.append((node.title, node.title_slug, node.level))
+        stack.extend(reversed(node.children))
+    return headings
+
+
+def build_heading_tree(headings):
+    '''Builds a heading tree in the same way as the heading processor.
+
+    Args:
+        headings: A list of tuples of the title, slug and level of each
+            heading, in document order.
+    Returns:
+        A tuple of HeadingNodes, or None if there are no headings.
+    '''
+    if len(headings) == 0:
+        return None
+    roots = []
+    current_node = None
+    for title, title_slug, level in headings:
+        parent = current_node
+        while parent is not None and parent.level >= level:
+            parent = parent.parent
+        new_node = DynamicHeadingNode(title, title_slug, level, parent, [])
+        if parent is None:
+            roots.append(new_node)
+        else:
+            parent.children.append(new_node)
+        current_node = new_node
+    return tuple(root.to_immutable() for root in roots)
@@ -1,5 +1,13 @@
 import markdown
 from verto.VertoExtension import VertoExtension
+from verto.utils.DocumentSplitter import DocumentSplitter, supports_segments
+from verto.utils.ResultCache import ResultCache
+from verto.utils.overrides import BLOCK_LEVEL_ELEMENTS
+from multiprocessing import Pool
+import copy
+import json
+import os
+import threading
 
 DEFAULT_PROCESSORS = frozenset({
     'blockquote',
@@ -24,6 +32,10 @@ DEFAULT_PROCESSORS = frozenset({
     'table-of-contents',
     'video'
 })
+# Paragraph added after a segment, so the whitespace Markdown places
+# after the last element of the segment is not stripped
+SEGMENT_END = 'VertoSegmentEnd'
+SEGMENT_END_HTML = '<p>{}</p>'.format(SEGMENT_END)
 
 
 class Verto(object):
@@ -31,7 +43,8 @@ class Verto(object):
     to HTML.
     '''
 
-    def __init__(self, processors=DEFAULT_PROCESSORS, html_templates={}, extensions=[], custom_argument_rules={}):
+    def __init__(self, processors=DEFAULT_PROCESSORS, html_templates={}, extensions=[], custom_argument_rules={},
+                 cache=None, trusted_input=False, block_level_elements=BLOCK_LEVEL_ELEMENTS, verbatim_templates=False):
         '''Creates a Verto object.
 
         Args:
@@ -47,13 +60,74 @@ class Verto(object):
                 markdown package.
             custom_argument_rules: A dictionary of rules for the processors to
                 override default processor rules.
+            cache: A ResultCache to reuse conversion results from, for
+                documents previously converted with the same
+                configuration. Results are not cached if None.
+            trusted_input: True if documents have already been checked
+                against the style rules (for example by a linter), so
+                style validation is skipped.
+            block_level_elements: A list of names of block level
+                elements, or regular expressions matching them (e.g.
+                'h[1-6]'), which are not wrapped in paragraphs when
+                output as raw html.
+            verbatim_templates: True if the html rendered by the
+                templates of the button-link, iframe, image-tag,
+                table-of-contents and video processors is output
+                exactly as rendered, which is faster as it is not
+                parsed and serialized again.
         '''
         self.processors = set(processors)
         self.html_templates = dict(html_templates)
         self.extensions = list(extensions)
         self.custom_argument_rules = custom_argument_rules
+        self.cache = cache
+        self.trusted_input = trusted_input
+        self.block_level_elements = list(block_level_elements)
+        self.verbatim_templates = verbatim_templates
+        self._lock = threading.Lock()
         self.create_converter()
 
+    def __getstate__(self):
+        '''Returns the state of the converter for pickling, allowing
+        a configured converter to be sent to other processes. The
+        markdown converter is not picklable and is rebuilt from the
+        Verto extension when unpickled.
+
+        Returns:
+            A dictionary of the configuration and Verto extension.
+        '''
+        return {
+            'processors': self.processors,
+            'html_templates': self.html_templates,
+            'extensions': self.extensions,
+            'custom_argument_rules': self.custom_argument_rules,
+            'cache': self.cache,
+            'trusted_input': self.trusted_input,
+            'block_level_elements': self.block_level_elements,
+            'verbatim_templates': self.verbatim_templates,
+            'verto_extension': self.verto_extension,
+        }
+
+    def __setstate__(self, state):
+        '''Rebuilds the converter from the state created by
+        __getstate__.
+
+        Args:
+            state: A dictionary of the configuration and Verto extension.
+        '''
+        self.processors = state['processors']
+        self.html_templates = state['html_templates']
+        self.extensions = state['extensions']
+        self.custom_argument_rules = state['custom_argument_rules']
+        self.cache = state['cache']
+        self.trusted_input = state['trusted_input']
+        self.block_level_elements = state['block_level_elements']
+        self.verbatim_templates = state['verbatim_templates']
+        self.verto_extension = state['verto_extension']
+        self._lock = threading.Lock()
+        self.fingerprint = None
+        self.create_markdown()
+
     def create_converter(self):
         '''Create the Verto extension and converter for future use.'''
         self.verto_extension = VertoExtension(
@@ -61,42 +135,361 @@ class Verto(object):
             html_templates=self.html_templates,
             extensions=self.extensions,
             custom_argument_rules=self.custom_argument_rules,
+            trusted_input=self.trusted_input,
+            block_level_elements=self.block_level_elements,
+            verbatim_templates=self.verbatim_templates,
         )
+        self.fingerprint = None
+        self.create_markdown()
+
+    def create_markdown(self):
+        '''Create the markdown converter using the existing Verto
+        extension. Markdown converters are not thread-safe, so idle
+        converters are kept for reuse and an extra converter is only
+        created when all others are in use by another thread.
+        '''
+        self.converter = self._build_markdown()
+        self._idle_converters = [self.converter]
+
+    def _build_markdown(self):
+        '''Returns a new markdown converter using the existing Verto
+        extension.
+        '''
         all_extensions = self.extensions + [self.verto_extension]
-        self.converter = markdown.Markdown(extensions=all_extensions)
+        return markdown.Markdown(extensions=all_extensions)
+
+    def configuration_fingerprint(self):
+        '''Returns a fingerprint of the configuration of the converter,
+        which changes when any configuration that affects the output
+        of a conversion is changed.
+
+        Returns:
+            A string of a hexadecimal digest.
+        '''
+        fingerprint = self.fingerprint
+        if fingerprint is None:
+            from verto import __version__
+            extensions = []
+            for extension in self.extensions:
+                if isinstance(extension, str):
+                    extensions.append(extension)
+                else:
+                    extension_class = type(extension)
+                    extensions.append('{}.{}{!r}'.format(
+                        extension_class.__module__,
+                        extension_class.__qualname__,
+                        sorted(extension.getConfigs().items())
+                    ))
+            fingerprint = ResultCache.key(
+                __version__,
+                markdown.version,
+                json.dumps(sorted(self.processors)),
+                json.dumps(self.html_templates, sort_keys=True),
+                json.dumps(self.custom_argument_rules, sort_keys=True),
+                json.dumps(extensions),
+                json.dumps(self.trusted_input),
+                json.dumps(self.block_level_elements),
+                json.dumps(self.verbatim_templates),
+            )
+            self.fingerprint = fingerprint
+        return fingerprint
+
+    def _convert(self, text, context):
+        '''Converts the given text, storing the document data in the
+        given context. If a cache is used, the result is reused from
+        the cache when the same text was converted with the same
+        configuration and saved slugs.
+
+        Args:
+            text: A string of Markdown text to be converted.
+            context: The ConversionContext for the document.
+        Returns:
+            A string of HTML text.
+        '''
+        cache = self.cache
+        if cache is None:
+            return self._convert_markdown(text, context)
+
+        verto_extension = self.verto_extension
+        with verto_extension.lock:
+            saved_slugs = sorted(verto_extension.saved_context.custom_slugify.uids)
+        key = ResultCache.key(self.configuration_fingerprint(), context.configuration, '\n'.join(saved_slugs), text)
+
+        entry = cache.get(key)
+        if entry is not None:
+            context.title = entry['title']
+            context.heading_tree = entry['heading_tree']
+            context.custom_slugify.add_uids(entry['slugs'])
+            for file_type, files in entry['required_files'].items():
+                context.required_files[file_type].update(files)
+            for term, references in entry['glossary_terms'].items():
+                context.glossary_terms[term].extend(references)
+            return entry['html_string']
+
+        html_string = self._convert_markdown(text, context)
+        cache.set(key, {
+            'html_string': html_string,
+            'title': context.title,
+            'heading_tree': context.heading_tree,
+            'slugs': set(context.custom_slugify.uids),
+            'required_files': dict(context.required_files),
+            'glossary_terms': dict(context.glossary_terms),
+        })
+        return html_string
 
-    def convert(self, text):
+    def _convert_markdown(self, text, context):
+        '''Converts the given text with an idle markdown converter,
+        storing the document data in the given context. An idle
+        converter with the processors of the context already installed
+        is preferred.
+
+        Args:
+            text: A string of Markdown text to be converted.
+            context: The ConversionContext for the document.
+        Returns:
+            A string of HTML text.
+        '''
+        with self._lock:
+            verto_extension = self.verto_extension
+            processors = context.processors
+            if processors is None:
+                processors = frozenset(verto_extension.processors)
+            idle_converters = self._idle_converters
+            converter = None
+            for index in range(len(idle_converters) - 1, -1, -1):
+                if idle_converters[index].verto_installed_processors == processors:
+                    converter = idle_converters.pop(index)
+                    break
+            if converter is None:
+                converter = idle_converters.pop() if idle_converters else self._build_markdown()
+
+        try:
+            verto_extension.install_processors(converter, processors)
+            with verto_extension.using_context(context):
+                return converter.reset().convert(text)
+        finally:
+            # Converters of a replaced extension are discarded
+            with self._lock:
+                if idle_converters is self._idle_converters:
+                    idle_converters.append(converter)
+
+    def _convert_segment(self, text, context, document_end):
+        '''Converts a segment of a document, where the HTML of the
+        segments of a document joined together is the same as the HTML
+        of the whole document.
+
+        Args:
+            text: A string of Markdown text of the segment.
+            context: The ConversionContext for the segment.
+            document_end: True if the segment is the end of the
+                document.
+        Returns:
+            A string of HTML text, including the whitespace before the
+            next segment.
+        '''
+        if document_end:
+            return self._convert_markdown(text, context)
+        html_string = self._convert_markdown(text + '\n\n' + SEGMENT_END, context)
+        if html_string.endswith(SEGMENT_END_HTML):
+            html_string = html_string[:-len(SEGMENT_END_HTML)]
+        else:
+            html_string = html_string.replace(SEGMENT_END_HTML, '') + '\n'
+        return html_string.lstrip()
+
+    def convert(self, text, processors=None, html_templates=None, custom_argument_rules=None):
         '''Return a VertoResult object after converting
-        the given markdown string.
+        the given markdown string. A converter may be used by
+        multiple threads at once, as each conversion has its own
+        document context.
+
+        The configuration of the converter can be overridden for this
+        conversion only, without rebuilding or changing the converter.
 
         Args:
             text: A string of Markdown text to be converted.
+            processors: A set of processor names to enable instead of
+                the processors of the converter.
+            html_templates: A dictionary of HTML templates to override
+                the templates of the converter.
+            custom_argument_rules: A dictionary of rules for the
+                processors to override the rules of the converter.
+
+        Returns:
+            A VertoResult object.
+        '''
+        verto_extension = self.verto_extension
+        context = verto_extension.create_context(processors, html_templates, custom_argument_rules)
+        html_string = self._convert(text, context)
+        return self._create_result(verto_extension, context, html_string)
+
+    def convert_stream(self, readable, writable, processors=None, html_templates=None, custom_argument_rules=None):
+        '''Converts a document read from the given file object, writing
+        the HTML to the given file object as it is converted, so the
+        whole document is not kept in memory.
+
+        The document is split at top-level headings and blank lines
+        outside of container and conditional tags (see DocumentSplitter),
+        and each segment is converted in turn with the same conversion
+        context, so heading numbers, slugs and required files carry on
+        across segments. Reference-style link definitions are given to
+        the segment they are in and all segments after it. Results are
+        not cached, and the whole document is converted at once when
+        using an extension which needs the whole document.
+
+        Args:
+            readable: A file object to read Markdown text from.
+            writable: A file object to write HTML text to.
+            processors: A set of processor names to enable instead of
+                the processors of the converter.
+            html_templates: A dictionary of HTML templates to override
+                the templates of the converter.
+            custom_argument_rules: A dictionary of rules for the
+                processors to override the rules of the converter.
+
+        Returns:
+            A VertoResult object, where the html_string is None as the
+            HTML is written to the writable file object.
+        '''
+        verto_extension = self.verto_extension
+        context = verto_extension.create_context(processors, html_templates, custom_argument_rules)
+        if not supports_segments(self.extensions):
+            writable.write(self._convert_markdown(readable.read(), context))
+            return self._create_result(verto_extension, context, None)
+
+        enabled_processors = context.processors if context.processors is not None else verto_extension.processors
+        splitter = DocumentSplitter(verto_extension.processor_info, enabled_processors)
+        references = []
+        segment = None
+        # A segment is converted once the next segment is read, so the
+        # last segment of the document is known
+        for next_segment in splitter.split_lines(_read_lines(readable), references):
+            if segment is not None:
+                writable.write(self._convert_stream_segment(segment, references, context, False))
+                context.document_start = False
+            segment = next_segment
+        writable.write(self._convert_stream_segment(segment, references, context, True))
+        return self._create_result(verto_extension, context, None)
+
+    def _convert_stream_segment(self, lines, references, context, document_end):
+        '''Converts a segment of a streamed document, where the
+        reference definitions read so far are appended to the segment
+        after a blank line, so reference-style links can be resolved.
 
+        Args:
+            lines: A list of strings of the lines of the segment.
+            references: A list of strings of the lines of reference
+                definitions read so far.
+            context: The ConversionContext of the document.
+            document_end: True if the segment is the end of the
+                document.
+        Returns:
+            A string of HTML text of the segment.
+        '''
+        if references:
+            lines = lines + [''] + references
+        return self._convert_segment('\n'.join(lines), context, document_end)
+
+    def _create_result(self, verto_extension, context, html_string):
+        '''Merges the context of a finished conversion into the saved
+        data of the extension, and creates the result of the conversion.
+
+        Args:
+            verto_extension: The VertoExtension the document was
+                converted with.
+            context: The ConversionContext of the document.
+            html_string: A string of the converted HTML text.
         Returns:
             A VertoResult object.
         '''
-        self.verto_extension.clear_document_data()
-        html_string = self.converter.convert(text)
+        verto_extension.merge_context(context)
+        required_files, glossary_terms = verto_extension.copy_saved_data()
         result = VertoResult(
             html_string=html_string,
-            title=self.verto_extension.title,
-            required_files=self.verto_extension.required_files,
-            heading_tree=self.verto_extension.get_heading_tree(),
-            required_glossary_terms=self.verto_extension.glossary_terms
+            title=context.title,
+            required_files=required_files,
+            heading_tree=context.heading_tree,
+            required_glossary_terms=glossary_terms
         )
         return result
 
+    def convert_many(self, texts_or_paths, workers=None, chunksize=1):
+        '''Return a list of VertoResult objects after converting each of
+        the given documents, using a pool of worker processes.
+
+        Each worker builds a converter with the same configuration as
+        this converter. Documents are converted independently of each
+        other, and data saved between documents (required files,
+        glossary terms and used slugs) is merged back into this
+        converter in input order, so the output does not depend on
+        how documents are scheduled across workers.
+
+        Args:
+            texts_or_paths: An iterable of documents, where a string is
+                treated as Markdown text and a path-like object is read
+                as a UTF-8 encoded Markdown file.
+            workers: The number of worker processes to use. Defaults
+                to the number of CPUs available.
+            chunksize: The number of documents sent to a worker at a
+                time.
+
+        Returns:
+            A list of VertoResult objects in the same order as the
+            given documents.
+        '''
+        documents = list(texts_or_paths)
+        if len(documents) == 0:
+            return []
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = max(1, min(workers, len(documents)))
+
+        if workers == 1:
+            converter = copy.deepcopy(self)
+            outputs = [_convert_document_with(converter, document) for document in documents]
+        else:
+            with Pool(workers, initializer=_initialise_worker, initargs=(self, )) as pool:
+                outputs = pool.map(_convert_document, documents, chunksize)
+
+        verto_extension = self.verto_extension
+        for html_string, context in outputs:
+            verto_extension.merge_context(context)
+        required_files, glossary_terms = verto_extension.copy_saved_data()
+
+        results = []
+        for html_string, context in outputs:
+            result = VertoResult(
+                html_string=html_string,
+                title=context.title,
+                required_files=required_files,
+                heading_tree=context.heading_tree,
+                required_glossary_terms=glossary_terms
+            )
+            results.append(result)
+        return results
+
     def clear_saved_data(self):
         '''Clears data that is saved between documents. This should be
         called between conversions on unrelated documents.
         '''
         self.verto_extension.clear_saved_data()
 
+    def render_cache_info(self):
+        '''Returns the statistics of the cache of rendered tags, which
+        is shared between documents, so tags repeated with the same
+        arguments are only rendered and parsed once.
+
+        Returns:
+            A RenderCacheInfo of the hits, misses, maximum size and
+            current size of the cache.
+        '''
+        return self.verto_extension.render_cache.cache_info()
+
     def update_templates(self, html_templates):
         '''Update the template dictionary with the given dictionary
         of templates, while leaving all other HTML templates (including
         any custom set templates) untouched. The updated dictionary
-        will be used for converting from this point onwards.
+        will be used for converting from this point onwards. Data saved
+        between documents is cleared, as when the converter is created.
 
         Args:
             html_templates: A dictionary of HTML templates to override
@@ -106,13 +499,19 @@ class Verto(object):
                 eg: {'image': '<img src={{ source }}>'}
         '''
         self.html_templates.update(html_templates)
-        self.create_converter()
+        self.verto_extension.update_templates(self.html_templates)
+        self.verto_extension.clear_saved_data()
+        self.fingerprint = None
 
     def clear_templates(self):
-        '''Set the template dictionary to it's original values.
+        '''Set the template dictionary to it's original values. Data
+        saved between documents is cleared, as when the converter is
+        created.
         '''
         self.html_templates = {}
-        self.create_converter()
+        self.verto_extension.update_templates(self.html_templates)
+        self.verto_extension.clear_saved_data()
+        self.fingerprint = None
 
     @staticmethod
     def processor_defaults():
@@ -127,15 +526,19 @@ class Verto(object):
         '''Update the processors used for conversion with the given
         set. The updated set will be used for converting from this
         point onwards. If parameter is empty, default processors will
-        be used.
+        be used. Processors are enabled or disabled on the existing
+        markdown converters, without rebuilding them. Data saved between
+        documents is cleared, as when the converter is created.
 
         Args:
             processors: A set of processor names given as strings for
                 which their processors are enabled. If given, all other
                 processors are skipped.
         '''
+        self.verto_extension.update_processors(processors)
+        self.verto_extension.clear_saved_data()
         self.processors = set(processors)
-        self.create_converter()
+        self.fingerprint = None
 
 
 class VertoResult(object):
@@ -161,3 +564,74 @@ class VertoResult(object):
         self.required_files = required_files
         self.heading_tree = heading_tree
         self.required_glossary_terms = required_glossary_terms
+
+
+def _read_lines(readable):
+    '''Reads the lines of a file object in the same way as splitting
+    its text on newlines.
+
+    Args:
+        readable: A file object to read text from.
+    Returns:
+        A generator of strings of each line, without newlines.
+    '''
+    line = ''
+    for line in readable:
+        yield line[:-1] if line.endswith('\n') else line
+    if line == '' or line.endswith('\n'):
+        yield ''
+
+
+_worker_converter = None
+
+
+def _initialise_worker(converter):
+    '''Sets the converter used by a worker process of
+    Verto.convert_many.
+
+    Args:
+        converter: The Verto converter, which is pickled when sent
+            to the worker process.
+    '''
+    global _worker_converter
+    _worker_converter = converter
+
+
+def _convert_document(document):
+    '''Converts a single document in a worker process of
+    Verto.convert_many, with the converter set by _initialise_worker.
+
+    Args:
+        document: A string of Markdown text, or a path-like object of
+            a Markdown file.
+    Returns:
+        A tuple of the HTML string and the ConversionContext holding
+        only the data of this document.
+    '''
+    return _convert_document_with(_worker_converter, document)
+
+
+def _convert_document_with(converter, document):
+    '''Converts a single document for Verto.convert_many. Documents are
+    not merged into the data saved by the given converter, so each
+    document only avoids the slugs saved by the original converter.
+
+    Args:
+        converter: The copy of the Verto converter to convert with.
+        document: A string of Markdown text, or a path-like object of
+            a Markdown file.
+    Returns:
+        A tuple of the HTML string and the ConversionContext holding
+        only the data of this document.
+    '''
+    if isinstance(document, str):
+        text = document
+    else:
+        with open(os.fspath(document), encoding='utf-8') as f:
+            text = f.read()
+
+    context = converter.verto_extension.create_context()
+    html_string = converter._convert(text, context)
+    # Only the slugs of this document are sent back to the parent process
+    context.custom_slugify.parent = None
+    return html_string, context
@@ -15,8 +15,8 @@ from verto.processors.SaveTitlePreprocessor import SaveTitlePreprocessor
 from verto.processors.GlossaryLinkPattern import GlossaryLinkPattern
 from verto.processors.ConditionalProcessor import ConditionalProcessor
 from verto.processors.StylePreprocessor import StylePreprocessor
-from verto.processors.RemovePostprocessor import RemovePostprocessor
-from verto.processors.JinjaPostprocessor import JinjaPostprocessor
+from verto.processors.TagIndexPreprocessor import TagIndexPreprocessor
+from verto.processors.OutputPostprocessor import OutputPostprocessor
 from verto.processors.HeadingBlockProcessor import HeadingBlockProcessor
 from verto.processors.ScratchTreeprocessor import ScratchTreeprocessor
 from verto.processors.ScratchInlineTreeprocessor import ScratchInlineTreeprocessor
@@ -26,23 +26,28 @@ from verto.processors.GenericTagBlockProcessor import GenericTagBlockProcessor
 from verto.processors.GenericContainerBlockProcessor import GenericContainerBlockProcessor
 from verto.processors.PanelBlockProcessor import PanelBlockProcessor
 
-from verto.utils.UniqueSlugify import UniqueSlugify
+from verto.utils.ConversionContext import ConversionContext
 from verto.utils.HeadingNode import HeadingNode
-from verto.utils.overrides import BLOCK_LEVEL_ELEMENTS, is_block_level
+from verto.utils.RenderCache import RenderCache
+from verto.utils.TemplateRegistry import template_registry
+from verto.utils.overrides import BLOCK_LEVEL_ELEMENTS, BlockLevelClassifier
 from verto.utils.overrides import OListProcessor
+from verto.utils.overrides import RawHtmlPostprocessor
 from verto.utils.overrides import UListProcessor
 
 from verto.errors.CustomArgumentRulesError import CustomArgumentRulesError
 
 from collections import defaultdict, OrderedDict
-from os import listdir
-import os.path
-import re
+from contextlib import contextmanager
+import copy
 import json
+import threading
 
-from jinja2 import Environment, PackageLoader, select_autoescape
 import pkg_resources
 
+ALWAYS_ENABLED_PROCESSORS = frozenset({'style', 'output', 'tag-index'})
+MAX_CACHED_PROCESSOR_INFO = 64
+
 
 class VertoExtension(Extension):
     '''The Verto markdown extension which enables all the processors,
@@ -50,7 +55,8 @@ class VertoExtension(Extension):
     the Verto converter.
     '''
 
-    def __init__(self, processors=[], html_templates={}, extensions=[], custom_argument_rules={}, *args, **kwargs):
+    def __init__(self, processors=[], html_templates={}, extensions=[], custom_argument_rules={}, trusted_input=False,
+                 block_level_elements=BLOCK_LEVEL_ELEMENTS, verbatim_templates=False, *args, **kwargs):
         '''
         Args:
             processors: A set of processor names given as strings for which
@@ -62,17 +68,33 @@ class VertoExtension(Extension):
                 as values.
                 eg: {'image': '<img src={{ source }}>'}
             extensions: A list of extra extensions for compatibility.
+            custom_argument_rules: A dictionary of rules for the processors
+                to override default processor rules.
+            trusted_input: True if documents have already been checked
+                against the style rules, so style validation is skipped.
+            block_level_elements: A list of names of block level
+                elements, or regular expressions matching them, which
+                are not wrapped in paragraphs when output as raw html.
+            verbatim_templates: True if the html rendered by templates
+                of processors whose output is not changed afterwards
+                is output as rendered, rather than parsed and
+                serialized again.
         '''
         super().__init__(*args, **kwargs)
+        self.saved_context = ConversionContext()
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.html_templates = dict(html_templates)
+        self.extensions = list(extensions)
         self.jinja_templates = self.loadJinjaTemplates(html_templates)
         self.processors = processors
         self.custom_argument_rules = custom_argument_rules
+        self.trusted_input = trusted_input
+        self.block_level_classifier = BlockLevelClassifier(block_level_elements)
+        self.verbatim_templates = verbatim_templates
         self.processor_info = self.loadProcessorInfo()
-        self.title = None
-        self.heading_tree = None
-        self.custom_slugify = UniqueSlugify()
-        self.glossary_terms = defaultdict(list)
-        self.required_files = defaultdict(set)
+        self.processor_info_cache = OrderedDict()
+        self.render_cache = RenderCache()
         self.compatibility = []
         for extension in extensions:
             if isinstance(extension, utils.string_type):
@@ -81,6 +103,238 @@ class VertoExtension(Extension):
                 if extension.endswith('fenced_code'):
                     self.compatibility.append('fenced_code_block')
 
+    def __getstate__(self):
+        '''Returns the state of the extension for pickling. Compiled
+        templates and processors are not picklable, so only the
+        configuration and the data saved between documents are kept.
+
+        Returns:
+            A dictionary of the configuration and saved data.
+        '''
+        return {
+            'processors': self.processors,
+            'html_templates': self.html_templates,
+            'extensions': self.extensions,
+            'custom_argument_rules': self.custom_argument_rules,
+            'trusted_input': self.trusted_input,
+            'block_level_elements': self.block_level_classifier.block_level_elements,
+            'verbatim_templates': self.verbatim_templates,
+            'uids': self.saved_context.custom_slugify.uids,
+            'glossary_terms': self.saved_context.glossary_terms,
+            'required_files': self.saved_context.required_files,
+        }
+
+    def __setstate__(self, state):
+        '''Rebuilds the extension from the state created by
+        __getstate__.
+
+        Args:
+            state: A dictionary of the configuration and saved data.
+        '''
+        self.__init__(
+            processors=state['processors'],
+            html_templates=state['html_templates'],
+            extensions=state['extensions'],
+            custom_argument_rules=state['custom_argument_rules'],
+            trusted_input=state['trusted_input'],
+            block_level_elements=state['block_level_elements'],
+            verbatim_templates=state['verbatim_templates'],
+        )
+        self.saved_context.custom_slugify.add_uids(state['uids'])
+        self.saved_context.glossary_terms.update(state['glossary_terms'])
+        self.saved_context.required_files.update(state['required_files'])
+
+    @property
+    def context(self):
+        '''The ConversionContext of the conversion running in the current
+        thread. If no conversion context has been given, the saved context
+        of the extension is used, so data is kept between documents.
+        '''
+        context = getattr(self.local, 'context', None)
+        return context if context is not None else self.saved_context
+
+    @property
+    def processors(self):
+        '''The processors enabled for the current conversion.'''
+        processors = self.context.processors
+        return processors if processors is not None else self._processors
+
+    @processors.setter
+    def processors(self, processors):
+        self._processors = processors
+
+    @property
+    def jinja_templates(self):
+        '''The compiled templates for the current conversion.'''
+        jinja_templates = self.context.jinja_templates
+        return jinja_templates if jinja_templates is not None else self._jinja_templates
+
+    @jinja_templates.setter
+    def jinja_templates(self, jinja_templates):
+        self._jinja_templates = jinja_templates
+
+    @property
+    def processor_info(self):
+        '''The processor information for the current conversion.'''
+        processor_info = self.context.processor_info
+        return processor_info if processor_info is not None else self._processor_info
+
+    @processor_info.setter
+    def processor_info(self, processor_info):
+        self._processor_info = processor_info
+
+    @property
+    def title(self):
+        '''The title of the current document.'''
+        return self.context.title
+
+    @title.setter
+    def title(self, title):
+        self.context.title = title
+
+    @property
+    def heading_tree(self):
+        '''The heading tree of the current document.'''
+        return self.context.heading_tree
+
+    @property
+    def custom_slugify(self):
+        '''The UniqueSlugify used for the current document.'''
+        return self.context.custom_slugify
+
+    @property
+    def glossary_terms(self):
+        '''The glossary terms of the current context.'''
+        return self.context.glossary_terms
+
+    @property
+    def required_files(self):
+        '''The required files of the current context.'''
+        return self.context.required_files
+
+    def create_context(self, processors=None, html_templates=None, custom_argument_rules=None):
+        '''Creates a context for converting a document, where slugs
+        saved between documents are treated as taken. The configuration
+        of the extension can be overridden for the conversion, without
+        changing the extension.
+
+        Args:
+            processors: A set of processor names to enable instead of
+                the processors of the extension.
+            html_templates: A dictionary of HTML templates to override
+                the templates of the extension.
+            custom_argument_rules: A dictionary of rules for the
+                processors to override the rules of the extension.
+        Returns:
+            A new ConversionContext.
+        Raises:
+            CustomArgumentRulesError: If a custom argument rule is given
+                for a processor that is not enabled, or an argument that
+                does not exist.
+        '''
+        context = ConversionContext(custom_slugify=self.saved_context.custom_slugify.spawn())
+        if processors is None and not html_templates and not custom_argument_rules:
+            return context
+
+        if processors is not None:
+            context.processors = frozenset(processors)
+        if html_templates:
+            templates = dict(self.html_templates)
+            templates.update(html_templates)
+            context.jinja_templates = self.loadJinjaTemplates(templates)
+        if processors is not None or custom_argument_rules:
+            rules = copy.deepcopy(self.custom_argument_rules)
+            for processor, arguments in (custom_argument_rules or {}).items():
+                rules.setdefault(processor, {}).update(arguments)
+            enabled_processors = context.processors if context.processors is not None else self._processors
+            processor_info = self.get_processor_info(rules, enabled_processors)
+            if custom_argument_rules:
+                context.processor_info = processor_info
+        context.configuration = json.dumps([
+            sorted(processors) if processors is not None else None,
+            html_templates or {},
+            custom_argument_rules or {},
+        ], sort_keys=True)
+        return context
+
+    def get_processor_info(self, custom_argument_rules, processors):
+        '''Returns the processor information with the given rules
+        applied, which is shared between conversions using the same
+        rules.
+
+        Args:
+            custom_argument_rules: A dictionary of rules for the
+                processors to override default processor rules.
+            processors: A set of the enabled processor names.
+        Returns:
+            The processor information, which must not be modified.
+        Raises:
+            CustomArgumentRulesError: If a custom argument rule is given
+                for a processor that is not enabled, or an argument that
+                does not exist.
+        '''
+        key = json.dumps([custom_argument_rules, sorted(processors)], sort_keys=True)
+        with self.lock:
+            processor_info = self.processor_info_cache.get(key)
+            if processor_info is not None:
+                self.processor_info_cache.move_to_end(key)
+                return processor_info
+
+        json_data = pkg_resources.resource_string('verto', 'processor-info.json').decode('utf-8')
+        processor_info = json.loads(json_data, object_pairs_hook=OrderedDict)
+        self.modify_rules(processor_info, custom_argument_rules, processors)
+        with self.lock:
+            self.processor_info_cache[key] = processor_info
+            while len(self.processor_info_cache) > MAX_CACHED_PROCESSOR_INFO:
+                self.processor_info_cache.popitem(last=False)
+        return processor_info
+
+    @contextmanager
+    def using_context(self, context):
+        '''Uses the given context for conversions in the current thread
+        until the with statement is exited.
+
+        Args:
+            context: The ConversionContext for processors to use.
+        '''
+        previous_context = getattr(self.local, 'context', None)
+        self.local.context = context
+        try:
+            yield context
+        finally:
+            self.local.context = previous_context
+
+    def merge_context(self, context):
+        '''Adds the data of the given context to the data saved between
+        documents.
+
+        Args:
+            context: The ConversionContext of a finished conversion.
+        '''
+        with self.lock:
+            saved_context = self.saved_context
+            saved_context.custom_slugify.add_uids(context.custom_slugify.uids)
+            for term, references in context.glossary_terms.items():
+                saved_context.glossary_terms[term].extend(references)
+            for file_type, files in context.required_files.items():
+                saved_context.required_files[file_type].update(files)
+
+    def copy_saved_data(self):
+        '''Copies the data saved between documents.
+
+        Returns:
+            A tuple of the required files and glossary terms.
+        '''
+        with self.lock:
+            saved_context = self.saved_context
+            required_files = defaultdict(set)
+            for file_type, files in saved_context.required_files.items():
+                required_files[file_type] = set(files)
+            glossary_terms = defaultdict(list)
+            for term, references in saved_context.glossary_terms.items():
+                glossary_terms[term] = list(references)
+        return required_files, glossary_terms
+
     def extendMarkdown(self, md, md_globals):
         '''Inherited from the markdown.Extension class. Extends
         markdown with custom processors.
@@ -92,53 +346,115 @@ class VertoExtension(Extension):
         '''
         self.buildProcessors(md, md_globals)
 
-        def update_processors(processors, markdown_processors):
-            for processor_data in processors:
-                if processor_data[0] in self.processors:
-                    markdown_processors.add(processor_data[0], processor_data[1], processor_data[2])
-
-        update_processors(self.preprocessors, md.preprocessors)
-        update_processors(self.blockprocessors, md.parser.blockprocessors)
-        update_processors(self.inlinepatterns, md.inlinePatterns)
-        update_processors(self.treeprocessors, md.treeprocessors)
-        update_processors(self.postprocessors, md.postprocessors)
-
-        md.preprocessors.add('style', StylePreprocessor(self, md), '_begin')
-        md.postprocessors.add('remove', RemovePostprocessor(md), '_end')
-        md.postprocessors.add('jinja', JinjaPostprocessor(md), '_end')
+        # Every processor is built, so processors can be enabled later
+        # without rebuilding the markdown instance
+        md.verto_processors = []
+        for processors, markdown_processors in [
+                (self.preprocessors, md.preprocessors),
+                (self.blockprocessors, md.parser.blockprocessors),
+                (self.inlinepatterns, md.inlinePatterns),
+                (self.treeprocessors, md.treeprocessors),
+                (self.postprocessors, md.postprocessors)]:
+            for name, processor, location in processors:
+                md.verto_processors.append((markdown_processors, name, processor, location))
+        md.verto_processors.extend([
+            (md.preprocessors, 'style', StylePreprocessor(self, md), '_begin'),
+            (md.postprocessors, 'output', OutputPostprocessor(md), '_end'),
+            (md.preprocessors, 'tag-index', TagIndexPreprocessor(self, md), '_end'),
+        ])
+        if 'hilite' in self.compatibility and 'fenced_code_block' in self.compatibility:
+            processor = ScratchCompatibilityPreprocessor(self, md)
+            md.verto_processors.append((md.preprocessors, 'scratch-compatibility', processor, '<fenced_code_block'))
+        md.verto_installed_processors = None
+        md.verto_tag_names = None
+        self.install_processors(md)
 
         # Compatibility modules
-        md.postprocessors['raw_html'].isblocklevel = lambda html: is_block_level(html, BLOCK_LEVEL_ELEMENTS)
+        md.postprocessors['raw_html'] = RawHtmlPostprocessor(md)
+        md.postprocessors['raw_html'].isblocklevel = self.block_level_classifier
         md.parser.blockprocessors['olist'] = OListProcessor(md.parser)
         md.parser.blockprocessors['ulist'] = UListProcessor(md.parser)
 
-        if ('fenced_code_block' in self.compatibility and 'scratch' in self.processors):
-            md.preprocessors['fenced_code_block'].FENCED_BLOCK_RE = FENCED_BLOCK_RE_OVERRIDE
+    def install_processors(self, md, processors=None):
+        '''Installs the enabled processors into the given markdown
+        instance, removing any processors that are no longer enabled.
+        This must not be called while the markdown instance is
+        converting a document.
 
-        if ('hilite' in self.compatibility and 'fenced_code_block' in self.compatibility and
-           'scratch' in self.processors):
-            processor = ScratchCompatibilityPreprocessor(self, md)
-            md.preprocessors.add('scratch-compatibility', processor, '<fenced_code_block')
+        Args:
+            md: An instance of the markdown object extended by this
+                extension.
+            processors: A set of processor names to install instead of
+                the processors of the extension.
+        '''
+        processors = frozenset(processors if processors is not None else self.processors)
+        if md.verto_installed_processors == processors:
+            return
+
+        for markdown_processors, name, processor, location in md.verto_processors:
+            if name in markdown_processors:
+                del markdown_processors[name]
+        for markdown_processors, name, processor, location in md.verto_processors:
+            if (name in processors or name in ALWAYS_ENABLED_PROCESSORS or
+               (name == 'scratch-compatibility' and 'scratch' in processors)):
+                markdown_processors.add(name, processor, location)
+
+        if 'fenced_code_block' in self.compatibility:
+            fenced_code_block = md.preprocessors['fenced_code_block']
+            if 'scratch' in processors:
+                fenced_code_block.FENCED_BLOCK_RE = FENCED_BLOCK_RE_OVERRIDE
+            elif 'FENCED_BLOCK_RE' in vars(fenced_code_block):
+                del fenced_code_block.FENCED_BLOCK_RE
+        md.verto_installed_processors = processors
+
+    def update_processors(self, processors):
+        '''Sets the enabled processors. Markdown instances extended by
+        this extension install the processors before their next
+        conversion (see install_processors).
+
+        Args:
+            processors: A set of processor names given as strings.
+        Raises:
+            CustomArgumentRulesError: If a custom argument rule is given
+                for a processor that is not enabled.
+        '''
+        processors = set(processors)
+        for processor in self.custom_argument_rules:
+            if processor not in processors:
+                msg = '\'{}\' is not a valid processor.'.format(processor)
+                raise CustomArgumentRulesError(processor, msg)
+        self.processors = processors
+        self.render_cache.clear()
+
+    def update_templates(self, html_templates):
+        '''Sets the custom templates, which are used by processors from
+        the next template they render.
+
+        Args:
+            html_templates: A dictionary of HTML templates to override
+                existing HTML templates for processors.
+        '''
+        self.jinja_templates = self.loadJinjaTemplates(html_templates)
+        self.html_templates = dict(html_templates)
+        self.render_cache.clear()
 
     def clear_document_data(self):
         '''Clears information stored for a specific document.
         '''
-        self.title = None
-        self.heading_tree = None
+        self.context.clear_document_data()
 
     def clear_saved_data(self):
         '''Clears stored information from processors, should be called
         between runs on unrelated documents.
         '''
-        self.custom_slugify.clear()
-        self.glossary_terms.clear()
-        for key in self.required_files.keys():
-            self.required_files[key].clear()
+        with self.lock:
+            self.saved_context.clear_saved_data()
 
     def loadJinjaTemplates(self, custom_templates):
         '''Loads default templates from the templates directory, if
         a custom template is given that will override the default
-        template.
+        template. Templates are compiled once per process and shared
+        between extensions.
 
         Args:
             custom_templates: a dictionary of names to custom templates
@@ -147,20 +463,7 @@ class VertoExtension(Extension):
             A dictionary of tuples containing template-names to
             compiled jinja templated.
         '''
-        templates = {}
-        env = Environment(
-            loader=PackageLoader('verto', 'html-templates'),
-            autoescape=select_autoescape(['html'])
-        )
-        for file in listdir(os.path.join(os.path.dirname(__file__), 'html-templates')):
-            html_file = re.search(r'(.*?).html$', file)
-            if html_file:
-                processor_name = html_file.groups()[0]
-                if processor_name in custom_templates:
-                    templates[processor_name] = env.from_string(custom_templates[processor_name])
-                else:
-                    templates[processor_name] = env.get_template(file)
-        return templates
+        return template_registry.get_templates(custom_templates)
 
     def buildProcessors(self, md, md_globals):
         '''
@@ -238,7 +541,7 @@ class VertoExtension(Extension):
             The internal heading tree object. None if heading processor
             has not been run.
         '''
-        return self.heading_tree
+        return self.context.heading_tree
 
     def _set_heading_tree(self, tree):
         ''' An internal method for setting the heading tree from
@@ -249,20 +552,28 @@ class VertoExtension(Extension):
         '''
         assert isinstance(tree, tuple)
         assert all(isinstance(child, HeadingNode) for child in tree)
-        self.heading_tree = tree
+        self.context.heading_tree = tree
 
-    def modify_rules(self, json_data):
+    def modify_rules(self, json_data, custom_argument_rules=None, processors=None):
         '''
         Modify the default tag argument rules using given custom rules.
 
         Args:
             json_data: dictionary of rules for processors parsing tags
+            custom_argument_rules: dictionary of custom rules, if not
+                given the rules of the extension are used.
+            processors: set of enabled processors, if not given the
+                processors of the extension are used.
         Return:
             json_data: dictionary of rules for processors parsing tags,
                 with modified rules arcording to custom rules given.
         '''
-        for processor, arguments_to_modify in self.custom_argument_rules.items():
-            if processor not in self.processors:
+        if custom_argument_rules is None:
+            custom_argument_rules = self.custom_argument_rules
+        if processors is None:
+            processors = self.processors
+        for processor, arguments_to_modify in custom_argument_rules.items():
+            if processor not in processors:
                 msg = '\'{}\' is not a valid processor.'.format(processor)
                 raise CustomArgumentRulesError(processor, msg)
             for argument in arguments_to_modify.items():
@@ -1,4 +1,6 @@
 # flake8: noqa
 from .Verto import Verto
+from .AsyncVerto import AsyncVerto
+from .IncrementalVerto import IncrementalVerto
 
 __version__ = '0.10.0'
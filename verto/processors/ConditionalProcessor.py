@@ -1,8 +1,8 @@
 from markdown.blockprocessors import BlockProcessor
 from verto.errors.TagNotMatchedError import TagNotMatchedError
-from verto.processors.utils import etree, parse_arguments, blocks_to_string
+from verto.processors.utils import etree, parse_arguments, blocks_to_string, may_contain_tag
+from verto.processors.utils import content_placeholder, splice_contents, serialize_contents
 from verto.utils.HtmlParser import HtmlParser
-from verto.utils.HtmlSerializer import HtmlSerializer
 from collections import OrderedDict
 import re
 
@@ -20,13 +20,17 @@ class ConditionalProcessor(BlockProcessor):
             ext: An instance of the VertoExtension.
         '''
         super().__init__(*args, **kwargs)
+        self.ext = ext
         self.processor = 'conditional'
         self.pattern = re.compile(ext.processor_info[self.processor]['pattern'])
-        self.arguments = ext.processor_info[self.processor]['arguments']
-        template_name = ext.processor_info.get('template_name', self.processor)
-        self.template = ext.jinja_templates[template_name]
+        self.template_name = ext.processor_info.get('template_name', self.processor)
         self.template_parameters = ext.processor_info[self.processor].get('template_parameters', None)
 
+    @property
+    def arguments(self):
+        '''The argument rules of the processor for the current conversion.'''
+        return self.ext.processor_info[self.processor]['arguments']
+
     def test(self, parent, block):
         ''' Tests if the block if it contains any type of conditional
         types.
@@ -37,6 +41,8 @@ class ConditionalProcessor(BlockProcessor):
         Returns:
             Return true if any conditional tag is found.
         '''
+        if not may_contain_tag(self.parser.markdown, self.processor, block):
+            return False
         return self.pattern.search(block) is not None
 
     def run(self, parent, blocks):
@@ -54,7 +60,6 @@ class ConditionalProcessor(BlockProcessor):
                 a matching end tag.
         '''
         block = blocks.pop(0)
-        context = dict()
 
         start_tag = self.pattern.search(block)
         is_if = tag_starts_with('if', start_tag.group('args'))
@@ -86,9 +91,6 @@ class ConditionalProcessor(BlockProcessor):
         next_tag, block, content_blocks = self.get_content(blocks)
         if_content = self.parse_blocks(content_blocks)
 
-        context['if_expression'] = if_expression
-        context['if_content'] = if_content
-
         # Process elif statements
         elifs = OrderedDict()
         while next_tag is not None and tag_starts_with('elif', next_tag.group('args')):
@@ -97,27 +99,52 @@ class ConditionalProcessor(BlockProcessor):
             next_tag, block, content_blocks = self.get_content(blocks)
             content = self.parse_blocks(content_blocks)
             elifs[elif_expression] = content
-        context['elifs'] = elifs
 
         # Process else statement
         has_else = next_tag is not None and tag_starts_with('else', next_tag.group('args'))
-        else_content = ''
+        else_content = None
         if has_else:
             argument_values = parse_arguments(self.processor, next_tag.group('args'), self.arguments)
             next_tag, block, content_blocks = self.get_content(blocks)
             else_content = self.parse_blocks(content_blocks)
-        context['has_else'] = has_else
-        context['else_content'] = else_content
 
         if (next_tag is None or (next_tag is not None and not tag_starts_with('end', next_tag.group('args')))):
             msg = 'end conditional not found'
             raise TagNotMatchedError(self.processor, block, msg)
 
-        # Render template and compile into an element
-        html_string = self.template.render(context)
-        parser = HtmlParser()
-        parser.feed(html_string).close()
-        parent.append(parser.get_root())
+        # Render template with the contents spliced in, unless the
+        # template does not output the contents as given
+        template = self.ext.jinja_templates[self.template_name]
+        contents = [if_content] + list(elifs.values()) + ([else_content] if has_else else [])
+        placeholders = [content_placeholder(index) for index in range(len(contents))]
+        context = self.template_context(if_expression, elifs, has_else, placeholders)
+        root = splice_contents(template.render(context), contents)
+        if root is None:
+            context = self.template_context(if_expression, elifs, has_else, map(serialize_contents, contents))
+            root = HtmlParser.fromstring(template.render(context))
+        parent.append(root)
+
+    def template_context(self, if_expression, elifs, has_else, contents):
+        ''' Creates the context for rendering the template.
+
+        Args:
+            if_expression: A string of the if condition.
+            elifs: An ordered dictionary of elif conditions to contents.
+            has_else: True if there is an else statement.
+            contents: An iterable of strings of the html of the if
+                content, followed by each elif content and the else
+                content (if there is an else statement).
+        Returns:
+            A dictionary of the template context.
+        '''
+        contents = iter(contents)
+        context = dict()
+        context['if_expression'] = if_expression
+        context['if_content'] = next(contents)
+        context['elifs'] = OrderedDict((elif_expression, next(contents)) for elif_expression in elifs)
+        context['has_else'] = has_else
+        context['else_content'] = next(contents) if has_else else ''
+        return context
 
     def get_content(self, blocks):
         ''' Recursively parses blocks into an element tree, returning
@@ -178,23 +205,18 @@ class ConditionalProcessor(BlockProcessor):
 
     def parse_blocks(self, blocks):
         '''Recursively parses blocks into an element tree,
-        returning a string of the output.
+        returning the elements created.
 
         Args:
             blocks: The markdown blocks to process.
 
         Returns:
-            A string of the element tree which was created.
+            A list of the elements which were created.
         '''
-        # Parse all the inner content of the boxed-text tags
+        # Parse all the inner content of the conditional tags
         content_tree = etree.Element('content')
         self.parser.parseChunk(content_tree, blocks_to_string(blocks))
-
-        # Convert parsed element tree back into html text for rendering
-        content = ''
-        for child in content_tree:
-            content += HtmlSerializer.tostring(child)
-        return content
+        return list(content_tree)
 
 
 def tag_starts_with(argument_key, arguments, default=False):
@@ -1,9 +1,9 @@
 from markdown.blockprocessors import BlockProcessor
 from verto.errors.TagNotMatchedError import TagNotMatchedError
 from verto.errors.ArgumentValueError import ArgumentValueError
-from verto.processors.utils import etree, parse_arguments, process_parameters, blocks_to_string
+from verto.processors.utils import etree, parse_arguments, compile_parameters, process_parameters, blocks_to_string
+from verto.processors.utils import may_contain_tag, content_placeholder, splice_contents, serialize_contents
 from verto.utils.HtmlParser import HtmlParser
-from verto.utils.HtmlSerializer import HtmlSerializer
 import re
 
 
@@ -14,16 +14,34 @@ class GenericContainerBlockProcessor(BlockProcessor):
             ext: An instance of the Verto Extension.
         '''
         super().__init__(*args, **kwargs)
+        self.ext = ext
         self.processor = processor
-        tag_argument = ext.processor_info[self.processor].get('tag_argument', self.processor)
+        self.tag_argument = tag_argument = ext.processor_info[self.processor].get('tag_argument', self.processor)
         self.p_start = re.compile(r'(^|\n) *\{{{0} ?(?P<args>[^\}}]*)(?<! end)\}} *(\n|$)'.format(tag_argument))
         self.p_end = re.compile(r'(^|\n) *\{{{0} end\}} *(\n|$)'.format(tag_argument))
-        self.arguments = ext.processor_info[self.processor]['arguments']
-        template_name = ext.processor_info[self.processor].get('template_name', self.processor)
-        self.template = ext.jinja_templates[template_name]
+        self.template_name = ext.processor_info[self.processor].get('template_name', self.processor)
         self.template_parameters = ext.processor_info[self.processor].get('template_parameters', None)
-        self.process_parameters = lambda processor, parameters, argument_values: \
-            process_parameters(ext, processor, parameters, argument_values)
+        self.template_pipeline = compile_parameters(ext, self.template_parameters)
+
+    @property
+    def arguments(self):
+        '''The argument rules of the processor for the current conversion.'''
+        return self.ext.processor_info[self.processor]['arguments']
+
+    def process_parameters(self, processor, parameters, argument_values):
+        ''' Processes the given arguments by the parameter definitions
+        of the processor.
+
+        Args:
+            processor: The processor of the given arguments.
+            parameters: A dictionary of parameter definitions.
+            argument_values: A dictionary of argument to values.
+        Returns:
+            A dictionary of parameter to converted values.
+        '''
+        if parameters is self.template_parameters:
+            return self.template_pipeline(argument_values)
+        return process_parameters(self.ext, processor, parameters, argument_values)
 
     def test(self, parent, block):
         ''' Tests a block to see if the run method should be applied.
@@ -36,6 +54,8 @@ class GenericContainerBlockProcessor(BlockProcessor):
         Returns:
             True if there are any start or end tags within the block.
         '''
+        if not may_contain_tag(self.parser.markdown, self.tag_argument, block):
+            return False
         return self.p_start.search(block) is not None or self.p_end.search(block) is not None
 
     def run(self, parent, blocks):
@@ -103,23 +123,28 @@ class GenericContainerBlockProcessor(BlockProcessor):
 
         content_tree = etree.Element('content')
         self.parser.parseChunk(content_tree, blocks_to_string(content_blocks))
+        content = list(content_tree)
 
-        content = ''
-        for child in content_tree:
-            content += HtmlSerializer.tostring(child) + '\n'
-        content = content.strip('\n')
-
-        if content.strip() == '':
+        if len(content) == 0:
             message = 'content cannot be blank.'
-            raise ArgumentValueError(self.processor, 'content', content, message)
+            raise ArgumentValueError(self.processor, 'content', '', message)
 
-        argument_values['content'] = content
-        context = self.process_parameters(self.processor, self.template_parameters, argument_values)
+        # Each element of the content is on a new line
+        for element in content[:-1]:
+            element.tail = (element.tail or '') + '\n'
+        content[-1].tail = (content[-1].tail or '').rstrip('\n')
 
-        html_string = self.template.render(context)
-        parser = HtmlParser()
-        parser.feed(html_string).close()
-        parent.append(parser.get_root())
+        # The content is spliced into the rendered template, unless the
+        # template does not output the content as given
+        template = self.ext.jinja_templates[self.template_name]
+        argument_values['content'] = content_placeholder(0)
+        context = self.process_parameters(self.processor, self.template_parameters, argument_values)
+        root = splice_contents(template.render(context), [content])
+        if root is None:
+            argument_values['content'] = serialize_contents(content)
+            context = self.process_parameters(self.processor, self.template_parameters, argument_values)
+            root = HtmlParser.fromstring(template.render(context))
+        parent.append(root)
 
     def custom_parsing(self, content_blocks, argument_values):
         '''
@@ -1,6 +1,7 @@
 from markdown.blockprocessors import BlockProcessor
-from verto.processors.utils import parse_arguments, process_parameters
-from verto.utils.HtmlParser import HtmlParser
+from verto.processors.utils import append_template, compile_parameters, may_contain_tag, parse_arguments
+from verto.processors.utils import process_parameters
+from verto.utils.RenderCache import RenderedFragment
 import re
 
 
@@ -14,15 +15,33 @@ class GenericTagBlockProcessor(BlockProcessor):
             ext: An instance of the Verto Extension.
         '''
         super().__init__(*args, **kwargs)
+        self.ext = ext
         self.processor = processor
-        tag_argument = ext.processor_info[self.processor].get('tag_argument', self.processor)
+        self.tag_argument = tag_argument = ext.processor_info[self.processor].get('tag_argument', self.processor)
         self.pattern = re.compile(r'(^|\n) *\{{{0} ?(?P<args>[^\}}]*)(?<! end)\}} *(\n|$)'.format(tag_argument))
-        self.arguments = ext.processor_info[self.processor]['arguments']
-        template_name = ext.processor_info[self.processor].get('template_name', tag_argument)
-        self.template = ext.jinja_templates[template_name]
+        self.template_name = ext.processor_info[self.processor].get('template_name', tag_argument)
         self.template_parameters = ext.processor_info[self.processor].get('template_parameters', None)
-        self.process_parameters = lambda processor, parameters, argument_values: \
-            process_parameters(ext, processor, parameters, argument_values)
+        self.template_pipeline = compile_parameters(ext, self.template_parameters)
+
+    @property
+    def arguments(self):
+        '''The argument rules of the processor for the current conversion.'''
+        return self.ext.processor_info[self.processor]['arguments']
+
+    def process_parameters(self, processor, parameters, argument_values):
+        ''' Processes the given arguments by the parameter definitions
+        of the processor.
+
+        Args:
+            processor: The processor of the given arguments.
+            parameters: A dictionary of parameter definitions.
+            argument_values: A dictionary of argument to values.
+        Returns:
+            A dictionary of parameter to converted values.
+        '''
+        if parameters is self.template_parameters:
+            return self.template_pipeline(argument_values)
+        return process_parameters(self.ext, processor, parameters, argument_values)
 
     def test(self, parent, block):
         ''' Tests a block to see if the run method should be applied.
@@ -35,6 +54,8 @@ class GenericTagBlockProcessor(BlockProcessor):
         Returns:
             True if there is a match within the block.
         '''
+        if not may_contain_tag(self.parser.markdown, self.tag_argument, block):
+            return False
         return self.pattern.search(block) is not None
 
     def run(self, parent, blocks):
@@ -57,17 +78,52 @@ class GenericTagBlockProcessor(BlockProcessor):
         if after.strip() != '':
             blocks.insert(0, after)
 
-        argument_values = parse_arguments(self.processor, match.group('args'), self.arguments)
+        fragment = self.render_fragment(block, match.group('args'))
+        append_template(self.ext, self.parser.markdown, self.processor, parent, fragment)
+
+    def render_fragment(self, block, arguments):
+        ''' Renders the tag with the given arguments, reusing the
+        fragment of the same tag from the render cache of the extension
+        if it has been rendered recently with the same configuration.
+        The files required by the tag are added to the context either
+        way.
+
+        Args:
+            block: The block containing the tag.
+            arguments: A string of the arguments of the tag.
+        Returns:
+            The RenderedFragment of the tag.
+        '''
+        context = self.ext.context
+        template = self.ext.jinja_templates[self.template_name]
+        key = (self.processor, arguments.strip(), template, context.configuration)
+        fragment = self.ext.render_cache.get(key)
+        if fragment is None:
+            with context.recording_required_files() as required_files:
+                html_string = self.render(block, arguments)
+            fragment = RenderedFragment(html_string, required_files)
+            self.ext.render_cache.add(key, fragment)
+        else:
+            context.add_required_files(fragment.required_files)
+        return fragment
+
+    def render(self, block, arguments):
+        ''' Renders the template of the tag with the given arguments.
+
+        Args:
+            block: The block containing the tag.
+            arguments: A string of the arguments of the tag.
+        Returns:
+            A string of the rendered html.
+        '''
+        argument_values = parse_arguments(self.processor, arguments, self.arguments)
 
         extra_args = self.custom_parsing(argument_values)
         argument_values.update(extra_args)
 
         context = self.process_parameters(self.processor, self.template_parameters, argument_values)
 
-        html_string = self.template.render(context)
-        parser = HtmlParser()
-        parser.feed(html_string).close()
-        parent.append(parser.get_root())
+        return self.ext.jinja_templates[self.template_name].render(context)
 
     def custom_parsing(self, argument_values):
         '''
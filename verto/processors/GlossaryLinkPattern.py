@@ -23,12 +23,12 @@ class GlossaryLinkPattern(Pattern):
         self.processor = 'glossary-link'
         self.pattern = self.ext.processor_info['glossary-link']['pattern']
         self.compiled_re = re.compile(r'^(.*?){}(.*)$'.format(self.pattern), re.DOTALL | re.UNICODE)
-        self.arguments = ext.processor_info[self.processor]['arguments']
-        template_name = ext.processor_info.get('template_name', self.processor)
-        self.template = ext.jinja_templates[template_name]
+        self.template_name = ext.processor_info.get('template_name', self.processor)
 
-        self.ext_glossary_terms = ext.glossary_terms
-        self.unique_slugify = ext.custom_slugify
+    @property
+    def arguments(self):
+        '''The argument rules of the processor for the current conversion.'''
+        return self.ext.processor_info[self.processor]['arguments']
 
     def handleMatch(self, match):
         '''
@@ -51,13 +51,11 @@ class GlossaryLinkPattern(Pattern):
             'text': text
         }
 
-        glossary_reference = self.ext_glossary_terms[term]
+        glossary_reference = self.ext.context.glossary_terms[term]
         if reference is not None:
-            identifier = self.unique_slugify('glossary-' + term)
+            identifier = self.ext.context.custom_slugify('glossary-' + term)
             glossary_reference.append((reference, identifier))
             context['id'] = identifier
 
-        html_string = self.template.render(context)
-        parser = HtmlParser()
-        parser.feed(html_string).close()
-        return parser.get_root()
+        html_string = self.ext.jinja_templates[self.template_name].render(context)
+        return HtmlParser.fromstring(html_string)
@@ -16,16 +16,11 @@ class HeadingBlockProcessor(BlockProcessor):
             ext: The VertoExtension object.
         '''
         super().__init__(*args, **kwargs)
+        self.ext = ext
         self.processor = 'heading'
         self.max_levels = 6
         self.pattern = re.compile(ext.processor_info[self.processor]['pattern'])
-        self.template = ext.jinja_templates[self.processor]
-        self.custom_slugify = ext.custom_slugify
-        self.level_generator = LevelGenerator(self.max_levels)
-        self.roots = []
-        self.current_node = None
-        self.update_ext_tree = ext._set_heading_tree
-        self.get_ext_tree = ext.get_heading_tree
+        self.template_name = self.processor
 
     def test(self, parent, block):
         ''' Tests a block to see if the run method should be applied.
@@ -61,64 +56,52 @@ class HeadingBlockProcessor(BlockProcessor):
         if after:
             blocks.insert(0, after)
 
+        context = self.ext.context
+        if context.level_generator is None:
+            context.level_generator = LevelGenerator(self.max_levels)
+
         level = len(match.group('level'))
         heading = match.group('header').strip()
-        heading_slug = self.custom_slugify(heading)
-        level_trail = self.level_generator.next(level)
-
-        context = dict()
-        context['heading_level'] = level
-        context['heading_type'] = 'h{0}'.format(level)
-        context['title'] = heading
-        context['title_slug'] = heading_slug
+        heading_slug = context.custom_slugify(heading)
+        level_trail = context.level_generator.next(level)
+
+        template_context = dict()
+        template_context['heading_level'] = level
+        template_context['heading_type'] = 'h{0}'.format(level)
+        template_context['title'] = heading
+        template_context['title_slug'] = heading_slug
         for i, level_val in enumerate(level_trail):
-            context['level_{0}'.format(i + 1)] = level_val
+            template_context['level_{0}'.format(i + 1)] = level_val
 
-        html_string = self.template.render(context)
-        parser = HtmlParser()
-        parser.feed(html_string).close()
-        parent.append(parser.get_root())
+        html_string = self.ext.jinja_templates[self.template_name].render(template_context)
+        parent.append(HtmlParser.fromstring(html_string))
 
-        self.add_to_heading_tree(heading, heading_slug, level)
+        self.add_to_heading_tree(context, heading, heading_slug, level)
 
-    def add_to_heading_tree(self, heading, heading_slug, level):
+    def add_to_heading_tree(self, context, heading, heading_slug, level):
         ''' Adds a new heading to the heading tree.
 
         Args:
+            context: The ConversionContext of the document.
             heading: A string of the heading title
             heading_slug: A string of the heading title as a slug
             level: the level of the heading
         '''
-        if self.get_ext_tree() is None:  # We are likely on a new file
-            self.roots = []
-            self.current_node = None
-
         # Who is our parent node
-        parent = self.current_node
+        parent = context.current_heading
         while parent is not None and level <= parent.level:
             parent = parent.parent
 
-        # if we have no parent we are a new tree
-        if parent is None and self.current_node is not None:
-            # old tree is finished compile up and save
-            root_node = self.current_node
-            while root_node.parent is not None:
-                root_node = root_node.parent
-            self.roots.append(root_node.to_immutable())
-
-        # Make our new node
+        # Make our new node, if we have no parent we are a new tree
         new_node = DynamicHeadingNode(title=heading, title_slug=heading_slug, level=level, parent=parent, children=[])
         if parent is not None:
             parent.children.append(new_node)
+        else:
+            context.heading_roots.append(new_node)
+        context.current_heading = new_node
 
-        # Find the current root node
-        self.current_node = new_node
-        root_node = self.current_node
-        while root_node.parent is not None:
-            root_node = root_node.parent
-
-        # Update the extension tree
-        self.update_ext_tree(tuple(self.roots + [root_node.to_immutable(), ]))
+        # The document tree is rebuilt when next read
+        context.heading_tree = None
 
 
 class LevelGenerator:
@@ -1,6 +1,7 @@
 from verto.processors.GenericContainerBlockProcessor import GenericContainerBlockProcessor
 from verto.errors.ImageMissingCaptionError import ImageMissingCaptionError
 from verto.errors.ImageCaptionContainsImageError import ImageCaptionContainsImageError
+from verto.processors.utils import may_contain_tag
 from verto.utils.image_file_name_components import image_file_name_components
 import re
 
@@ -19,7 +20,6 @@ class ImageContainerBlockProcessor(GenericContainerBlockProcessor):
         self.processor = 'image-container'
         super().__init__(self.processor, ext, *args, **kwargs)
         self.pattern = re.compile(ext.processor_info[self.processor]['pattern'])
-        self.required = ext.required_files['images']
 
     def test(self, parent, block):
         ''' Tests a block to see if the run method should be applied.
@@ -32,6 +32,8 @@ class ImageContainerBlockProcessor(GenericContainerBlockProcessor):
         Returns:
             True if there are any start or end tags within the block.
         '''
+        if not may_contain_tag(self.parser.markdown, self.tag_argument, block):
+            return False
         return self.pattern.search(block) is not None or self.p_end.search(block) is not None
 
     def custom_parsing(self, content_blocks, argument_values):
@@ -63,7 +65,7 @@ class ImageContainerBlockProcessor(GenericContainerBlockProcessor):
         del(argument_values['file-path'])
         external_path_match = re.search(r'^http', file_path)
         if external_path_match is None:  # internal image
-            self.required.add(file_path)
+            self.ext.context.required_files['images'].add(file_path)
             file_relative = True
             extra_args.update(image_file_name_components(file_path))
         else:
@@ -14,14 +14,16 @@ class ImageInlinePattern(Pattern):
         Args:
             ext: An instance of the Markdown class.
         '''
+        self.ext = ext
         self.processor = 'image-inline'
-        self.arguments = ext.processor_info[self.processor]['arguments']
         self.pattern = ext.processor_info[self.processor]['pattern']
         self.compiled_re = re.compile('^(.*?){}(.*)$'.format(self.pattern), re.DOTALL | re.UNICODE)
-        template_name = ext.processor_info.get('template_name', self.processor)
-        self.template = ext.jinja_templates[template_name]
-        self.relative_image_template = ext.jinja_templates['relative-file-link']
-        self.required = ext.required_files['images']
+        self.template_name = ext.processor_info.get('template_name', self.processor)
+
+    @property
+    def arguments(self):
+        '''The argument rules of the processor for the current conversion.'''
+        return self.ext.processor_info[self.processor]['arguments']
 
     def handleMatch(self, match):
         ''' Inherited from Pattern. Accepts a match and returns an
@@ -40,7 +42,7 @@ class ImageInlinePattern(Pattern):
         file_path = argument_values['file-path']
         external_path_match = re.search(r'^http', file_path)
         if external_path_match is None:  # internal image
-            self.required.add(file_path)
+            self.ext.context.required_files['images'].add(file_path)
             file_relative = True
             context.update(image_file_name_components(file_path))
         else:
@@ -53,7 +55,5 @@ class ImageInlinePattern(Pattern):
         context['source_link'] = argument_values.get('source', None)
         context['hover_text'] = argument_values.get('hover-text', None)
 
-        html_string = self.template.render(context)
-        parser = HtmlParser()
-        parser.feed(html_string).close()
-        return parser.get_root()
+        html_string = self.ext.jinja_templates[self.template_name].render(context)
+        return HtmlParser.fromstring(html_string)
@@ -1,4 +1,5 @@
 from verto.processors.GenericTagBlockProcessor import GenericTagBlockProcessor
+from verto.processors.utils import may_contain_tag
 from verto.utils.image_file_name_components import image_file_name_components
 import re
 
@@ -17,7 +18,6 @@ class ImageTagBlockProcessor(GenericTagBlockProcessor):
         self.processor = 'image-tag'
         super().__init__(self.processor, ext, *args, **kwargs)
         self.caption_pattern = re.compile(ext.processor_info[self.processor]['pattern'])
-        self.required = ext.required_files['images']
 
     def test(self, parent, block):
         ''' Tests a block to see if the run method should be applied.
@@ -30,6 +30,8 @@ class ImageTagBlockProcessor(GenericTagBlockProcessor):
         Returns:
             True if there are any start tags within the block.
         '''
+        if not may_contain_tag(self.parser.markdown, self.tag_argument, block):
+            return False
         return self.caption_pattern.search(block) is None and self.pattern.search(block) is not None
 
     def custom_parsing(self, argument_values):
@@ -55,7 +57,7 @@ class ImageTagBlockProcessor(GenericTagBlockProcessor):
         # check if internal or external image
         external_path_match = re.search(r'^http', file_path)
         if external_path_match is None:  # internal image
-            self.required.add(file_path)
+            self.ext.context.required_files['images'].add(file_path)
             file_relative = True
             extra_args.update(image_file_name_components(file_path))
         else:
@@ -1,6 +1,7 @@
 from verto.processors.GenericContainerBlockProcessor import GenericContainerBlockProcessor
 from verto.errors.InteractiveTextContainsInteractiveError import InteractiveTextContainsInteractiveError
 from verto.errors.InteractiveMissingTextError import InteractiveMissingTextError
+from verto.processors.utils import may_contain_tag
 
 import re
 
@@ -21,10 +22,6 @@ class InteractiveContainerBlockProcessor(GenericContainerBlockProcessor):
         super().__init__(self.processor, ext, *args, **kwargs)
         self.pattern = re.compile(ext.processor_info[self.processor]['pattern'])
 
-        self.scripts = ext.required_files['page_scripts']
-        self.required_interactives = ext.required_files['interactives']
-        self.required_images = ext.required_files['images']
-
     def test(self, parent, block):
         ''' Tests a block to see if the run method should be applied.
 
@@ -36,6 +33,8 @@ class InteractiveContainerBlockProcessor(GenericContainerBlockProcessor):
         Returns:
             True if there are any start or end tags within the block.
         '''
+        if not may_contain_tag(self.parser.markdown, self.tag_argument, block):
+            return False
         return self.pattern.search(block) is not None or self.p_end.search(block) is not None
 
     def custom_parsing(self, content_blocks, argument_values):
@@ -66,7 +65,7 @@ class InteractiveContainerBlockProcessor(GenericContainerBlockProcessor):
         slug = argument_values['slug']
 
         # add to list of interactives
-        self.required_interactives.add(slug)
+        self.ext.context.required_files['interactives'].add(slug)
 
         if interactive_type == 'whole-page':
             argument = 'thumbnail'
@@ -80,7 +79,7 @@ class InteractiveContainerBlockProcessor(GenericContainerBlockProcessor):
             external_path_match = re.search(r'^http', thumbnail_file_path)
             if external_path_match is None:  # internal image
                 thumbnail_file_relative = True
-                self.required_images.add(thumbnail_file_path)
+                self.ext.context.required_files['images'].add(thumbnail_file_path)
             else:
                 thumbnail_file_relative = False
 
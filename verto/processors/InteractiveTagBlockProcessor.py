@@ -1,4 +1,5 @@
 from verto.processors.GenericTagBlockProcessor import GenericTagBlockProcessor
+from verto.processors.utils import may_contain_tag
 import re
 
 
@@ -15,9 +16,6 @@ class InteractiveTagBlockProcessor(GenericTagBlockProcessor):
         '''
         self.processor = 'interactive-tag'
         super().__init__(self.processor, ext, *args, **kwargs)
-        self.scripts = ext.required_files['page_scripts']
-        self.required_interactives = ext.required_files['interactives']
-        self.required_images = ext.required_files['images']
         self.text_pattern = re.compile(ext.processor_info[self.processor]['pattern'])
 
     def test(self, parent, block):
@@ -31,6 +29,8 @@ class InteractiveTagBlockProcessor(GenericTagBlockProcessor):
         Returns:
             True if there are any start or end tags within the block.
         '''
+        if not may_contain_tag(self.parser.markdown, self.tag_argument, block):
+            return False
         return self.text_pattern.search(block) is None and self.pattern.search(block) is not None
 
     def custom_parsing(self, argument_values):
@@ -46,10 +46,10 @@ class InteractiveTagBlockProcessor(GenericTagBlockProcessor):
         slug = argument_values['slug']
 
         # add to list of interactives
-        self.required_interactives.add(slug)
+        self.ext.context.required_files['interactives'].add(slug)
 
         if interactive_type == 'in-page':
-            self.scripts.add('interactive/{}/scripts.html'.format(slug))
+            self.ext.context.required_files['page_scripts'].add('interactive/{}/scripts.html'.format(slug))
         elif interactive_type == 'whole-page':
             argument = 'thumbnail'
             thumbnail_file_path = argument_values.get(argument, None)
@@ -62,7 +62,7 @@ class InteractiveTagBlockProcessor(GenericTagBlockProcessor):
             external_path_match = re.search(r'^http', thumbnail_file_path)
             if external_path_match is None:  # internal image
                 thumbnail_file_relative = True
-                self.required_images.add(thumbnail_file_path)
+                self.ext.context.required_files['images'].add(thumbnail_file_path)
             else:
                 thumbnail_file_relative = False
 
@@ -0,0 +1,42 @@
+from markdown.postprocessors import Postprocessor
+from html import unescape
+import re
+
+# A remove tag and its following newline, where the newline after a
+# closing tag may follow opening tags with their newlines
+REMOVE_TAG_RE = re.compile(r'</remove>(?:<remove>\n)*\n|</?remove>\n?')
+JINJA_BLOCK_RE = re.compile(r'\{% [^}]*\}(?<= %\})')
+
+
+class OutputPostprocessor(Postprocessor):
+    ''' Prepares the output document for further processing. Removes
+    all remove html tags (i.e. <remove> or </remove>) keeping the body
+    of said tags, which allows for the returning of illegal html, and
+    ensures all Jinja blocks are not escaped like other html blocks.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        ''' Creates a new OutputPostprocessor.
+        '''
+        super().__init__(*args, **kwargs)
+
+    def run(self, text):
+        '''
+        Args:
+            text: A string of the document.
+        Returns:
+            The document text with all remove tags removed and all
+            Jinja blocks unescaped.
+        '''
+        # Remove tags are removed first, as they may be within a Jinja block
+        text = REMOVE_TAG_RE.sub('', text)
+        return JINJA_BLOCK_RE.sub(self.unescape_block, text)
+
+    def unescape_block(self, match):
+        '''
+        Args:
+            match: The match of a Jinja block.
+        Returns:
+            The unescaped Jinja block.
+        '''
+        return unescape(match.group())
@@ -23,10 +23,11 @@ class RelativeLinkPattern(Pattern):
         Args:
             ext: An instance of the Markdown class.
         '''
+        self.ext = ext
         self.processor = 'relative-link'
         self.pattern = ext.processor_info[self.processor]['pattern']
         self.compiled_re = re.compile('^(.*?){}(.*)$'.format(self.pattern), re.DOTALL | re.UNICODE)
-        self.template = ext.jinja_templates[self.processor]
+        self.template_name = self.processor
 
     def handleMatch(self, match):
         ''' Inherited from Pattern. Accepts a match and returns an
@@ -43,7 +44,5 @@ class RelativeLinkPattern(Pattern):
             context['link_query'] = link_query
         context['text'] = match.group('link_text')
 
-        html_string = self.template.render(context)
-        parser = HtmlParser()
-        parser.feed(html_string).close()
-        return parser.get_root()
+        html_string = self.ext.jinja_templates[self.template_name].render(context)
+        return HtmlParser.fromstring(html_string)
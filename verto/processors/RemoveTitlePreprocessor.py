@@ -36,6 +36,8 @@ class RemoveTitlePreprocessor(Preprocessor):
         Returns:
             List of lines of document.
         '''
+        if not self.ext.context.document_start:  # Not the first line of the document
+            return lines
         if self.pattern.search(lines[0]) is not None:
             lines[0] = ''
         return lines
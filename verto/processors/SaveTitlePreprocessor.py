@@ -37,7 +37,9 @@ class SaveTitlePreprocessor(Preprocessor):
         Returns:
             The original list of strings of document.
         '''
+        if not self.ext.context.document_start:  # Not the first line of the document
+            return lines
         match = self.pattern.search(lines[0])
         if match is not None:
-            self.ext.title = match.group(1)
+            self.ext.context.title = match.group(1)
         return lines
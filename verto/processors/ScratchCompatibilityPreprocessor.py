@@ -42,13 +42,15 @@ class ScratchCompatibilityPreprocessor(Preprocessor):
             Markdown document with scratch codeblocks removed.
         '''
         text = '\n'.join(lines)
-        match = self.pattern.search(text)
-        while match is not None:
+        segments = []
+        position = 0
+        for match in self.pattern.finditer(text):
             code = self.CODE_FORMAT.format(self._escape(match.group('code')), match.group('options'))
             placeholder = self.markdown.htmlStash.store(code, safe=True)
-            text = text[:match.start()] + '\n' + placeholder + '\n' + text[match.end():]
-            match = self.pattern.search(text)
-        return text.split('\n')
+            segments.extend((text[position:match.start()], '\n', placeholder, '\n'))
+            position = match.end()
+        segments.append(text[position:])
+        return ''.join(segments).split('\n')
 
     def _escape(self, text):
         ''' basic html escaping, as per fenced_code.
@@ -18,8 +18,7 @@ class ScratchInlineTreeprocessor(ScratchTreeprocessor):
         super().__init__(ext, *args, **kwargs)
         self.processor = 'scratch-inline'
         self.pattern = re.compile(ext.processor_info[self.processor]['pattern'])
-        self.template = ext.jinja_templates[self.processor]
-        self.scratch_images = ext.required_files['scratch_images']
+        self.template_name = self.processor
         self.fenced_compatibility = 'fenced_code_block' in ext.compatibility
 
     def run(self, root):
@@ -54,9 +53,8 @@ class ScratchInlineTreeprocessor(ScratchTreeprocessor):
             content_hash = self.hash_content(block)
             self.update_required_images(content_hash, block)
 
-            parser = HtmlParser()
-            html_string = self.template.render({'hash': content_hash})
-            new_node = parser.feed(html_string).close().get_root()
+            html_string = self.ext.jinja_templates[self.template_name].render({'hash': content_hash})
+            new_node = HtmlParser.fromstring(html_string)
 
             node.tag = 'remove'
             node.text = ''
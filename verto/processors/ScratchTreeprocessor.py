@@ -31,10 +31,10 @@ class ScratchTreeprocessor(Treeprocessor):
             reside in.
         '''
         super().__init__(*args, **kwargs)
+        self.ext = ext
         self.processor = 'scratch'
         self.pattern = re.compile(ext.processor_info[self.processor]['pattern'])
-        self.template = ext.jinja_templates[self.processor]
-        self.scratch_images = ext.required_files['scratch_images']
+        self.template_name = self.processor
         self.fenced_compatibility = 'fenced_code_block' in ext.compatibility
 
     def run(self, root):
@@ -56,8 +56,7 @@ class ScratchTreeprocessor(Treeprocessor):
                 html_string, safe = self.markdown.htmlStash.rawHtmlBlocks[i]
                 node = None
                 try:
-                    parser = HtmlParser()
-                    node = parser.feed(html_string).close().get_root()
+                    node = HtmlParser.fromstring(html_string)
                 except etree.ParseError:
                     pass
 
@@ -98,9 +97,8 @@ class ScratchTreeprocessor(Treeprocessor):
                     self.update_required_images(content_hash, block)
                     images.append(content_hash)
 
-                html_string = self.template.render({'images': images})
-                parser = HtmlParser()
-                new_node = parser.feed(html_string).close().get_root()
+                html_string = self.ext.jinja_templates[self.template_name].render({'images': images})
+                new_node = HtmlParser.fromstring(html_string)
 
                 node.tag = 'remove'
                 node.text = ''
@@ -125,4 +123,4 @@ class ScratchTreeprocessor(Treeprocessor):
             content_hash: The image hash.
             text: The source text of the image.
         '''
-        self.scratch_images.add(ScratchImageMetaData(hash=content_hash, text=text))
+        self.ext.context.required_files['scratch_images'].add(ScratchImageMetaData(hash=content_hash, text=text))
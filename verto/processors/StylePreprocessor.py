@@ -24,37 +24,48 @@ class StylePreprocessor(Preprocessor):
         self.block_strings = ext.processor_info[self.processor]['strings']['block']
         self.inline_strings = ext.processor_info[self.processor]['strings']['inline']
 
-        self.LIST_RE = re.compile('^[ ]*(\d+\.|[*+-])[ ]+(.*)')
+        self.ext = ext
+        self.LIST_RE = re.compile(r'^[ ]*(\d+\.|[*+-])[ ]+(.*)')
+        # One pattern for all block tags, so each line is only searched once
+        block_names = '|'.join(re.escape(block_string) for block_string in self.block_strings)
+        self.block_re = re.compile(self.block_pattern.format(block='(?:{})'.format(block_names)))
 
     def run(self, lines):
         '''
         Validates lines and raising StyleErrors when rules are not upheld.
+        Validation is skipped if the extension is given trusted input.
         Args:
             lines: A string of Markdown text.
         Returns:
             The original document.
         '''
+        if self.ext.trusted_input:
+            return lines
+
+        block_re = self.block_re
         for i, line in enumerate(lines):
-            for block_string in self.block_strings:
-                c = re.compile(self.block_pattern.format(**{'block': block_string}))
-                block_match = c.search(line)
-                if block_match is not None:
-                    # Grab important lines and their numbers
-                    important_lines = (list(enumerate(lines))[max(0, i - 1): i + 2])
-                    line_nums, error_lines = zip(*map(lambda x: (x[0] + 1, x[1].strip()), important_lines))
-
-                    # Remove all empty lines, should only be one line left
-                    if len([line for line in error_lines if line != '']) != 1:
-                        raise StyleError(line_nums, error_lines, 'Blocks must be separated by whitespace.')
-
-                    start_index, end_index = block_match.span()
-                    rest = line[:start_index] + line[end_index+1:]
-
-                    if (self.LIST_RE.match(line[:start_index]) and
-                       not all(map(lambda char: char.isspace(), line[end_index+1:]))):
-                            raise StyleError(line_nums, error_lines, 'Content after block in list.')
-                    elif (not self.LIST_RE.match(line[:start_index]) and
-                          not all(map(lambda char: char.isspace(), rest))):
-                            raise StyleError(line_nums, error_lines, 'Blocks must be the only thing on the line.')
+            if '{' not in line:
+                continue
+            block_match = block_re.search(line)
+            if block_match is None:
+                continue
+
+            # Grab important lines and their numbers
+            first = max(0, i - 1)
+            error_lines = tuple(neighbour.strip() for neighbour in lines[first: i + 2])
+            line_nums = tuple(range(first + 1, first + 1 + len(error_lines)))
+
+            # Remove all empty lines, should only be one line left
+            if len([error_line for error_line in error_lines if error_line != '']) != 1:
+                raise StyleError(line_nums, error_lines, 'Blocks must be separated by whitespace.')
+
+            start_index, end_index = block_match.span()
+            rest = line[:start_index] + line[end_index+1:]
+
+            if self.LIST_RE.match(line[:start_index]):
+                if not line[end_index+1:].isspace() and line[end_index+1:] != '':
+                    raise StyleError(line_nums, error_lines, 'Content after block in list.')
+            elif not rest.isspace() and rest != '':
+                raise StyleError(line_nums, error_lines, 'Blocks must be the only thing on the line.')
 
         return lines
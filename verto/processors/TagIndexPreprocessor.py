@@ -0,0 +1,35 @@
+from markdown.preprocessors import Preprocessor
+import re
+
+
+class TagIndexPreprocessor(Preprocessor):
+    '''Finds the names of all tags in the document once, so block
+    processors can skip blocks for tags that are not in the document
+    without searching each block.
+    '''
+
+    def __init__(self, ext, *args, **kwargs):
+        '''
+        Args:
+            ext: An instance of the VertoExtension.
+        '''
+        super().__init__(*args, **kwargs)
+        self.ext = ext
+        self.processor = 'tag-index'
+        self.pattern = re.compile(ext.processor_info[self.processor]['pattern'])
+
+    def run(self, lines):
+        '''Stores the set of tag names found in the document on the
+        markdown instance, which is only used for one conversion at
+        a time. Every prefix of a name is stored, as a block
+        processor matches any tag that starts with its name (e.g.
+        '{boxed-textual}' is matched by the boxed-text processor).
+
+        Args:
+            lines: A list of strings that form the document.
+        Returns:
+            The unchanged list of lines of the document.
+        '''
+        names = set(self.pattern.findall('\n'.join(lines)))
+        self.markdown.verto_tag_names = frozenset(name[:end] for name in names for end in range(1, len(name) + 1))
+        return lines
@@ -1,8 +1,7 @@
 from verto.processors.GenericTagBlockProcessor import GenericTagBlockProcessor
 from verto.errors.NoVideoIdentifierError import NoVideoIdentifierError
 from verto.errors.UnsupportedVideoPlayerError import UnsupportedVideoPlayerError
-from verto.processors.utils import parse_arguments
-from verto.utils.HtmlParser import HtmlParser
+from verto.processors.utils import may_contain_tag, parse_arguments
 import re
 
 
@@ -18,8 +17,6 @@ class VideoBlockProcessor(GenericTagBlockProcessor):
         '''
         super().__init__('video', ext, *args, **kwargs)
         self.pattern = re.compile(ext.processor_info[self.processor]['pattern'])
-        self.youtube_template = ext.jinja_templates['video-youtube']
-        self.vimeo_template = ext.jinja_templates['video-vimeo']
 
     def test(self, parent, block):
         ''' Return whether block contains a video tag.
@@ -30,29 +27,20 @@ class VideoBlockProcessor(GenericTagBlockProcessor):
         Returns:
             True if a video tag is found
         '''
+        if not may_contain_tag(self.parser.markdown, self.tag_argument, block):
+            return False
         return self.pattern.search(block) is not None
 
-    def run(self, parent, blocks):
-        '''Replaces all video tags {video url="example"} with embeded
-        video link. Inherited from BlockProcessor class.
+    def render(self, block, arguments):
+        '''Renders the embeded player of a video tag
+        {video url="example"}.
 
         Args:
-            parent: Element which this block is in.
-            block: A string of markdown text to be converted.
+            block: The block containing the tag.
+            arguments: A string of the arguments of the tag.
+        Returns:
+            A string of the rendered html.
         '''
-
-        block = blocks.pop(0)
-
-        match = self.pattern.search(block)
-        before = block[:match.start()]
-        after = block[match.end():]
-
-        if before.strip() != '':
-            self.parser.parseChunk(parent, before)
-        if after.strip() != '':
-            blocks.insert(0, after)
-
-        arguments = match.group('args')
         argument_values = parse_arguments(self.processor, arguments, self.arguments)
         url = argument_values['url']
 
@@ -70,14 +58,11 @@ class VideoBlockProcessor(GenericTagBlockProcessor):
 
         if url and video_type:
             if video_type == 'youtube':
-                context['video_url'] = self.youtube_template.render(context)
+                context['video_url'] = self.ext.jinja_templates['video-youtube'].render(context)
             elif video_type == 'vimeo':
-                context['video_url'] = self.vimeo_template.render(context)
+                context['video_url'] = self.ext.jinja_templates['video-vimeo'].render(context)
 
-        html_string = self.template.render(context)
-        parser = HtmlParser()
-        parser.feed(html_string).close()
-        parent.append(parser.get_root())
+        return self.ext.jinja_templates[self.template_name].render(context)
 
     def extract_video_identifier(self, video_url):
         '''Extracts an identifier and service from a video url.
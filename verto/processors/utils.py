@@ -1,36 +1,107 @@
 import re
-from markdown.util import etree  # noqa: F401
-from collections import OrderedDict, defaultdict
+from functools import lru_cache, partial
+from markdown.util import etree, AtomicString, isBlockLevel
+from collections import defaultdict
 from verto.errors.ArgumentDefinitionError import ArgumentDefinitionError
 from verto.errors.ArgumentMissingError import ArgumentMissingError
 from verto.errors.ArgumentValueError import ArgumentValueError
+from verto.utils.HtmlParser import HtmlParser
+from verto.utils.HtmlSerializer import HtmlSerializer
 
 
-def parse_argument(argument_key, arguments, default=None):
-    '''Search for the given argument in a string of all arguments
+ARGUMENT_NAME_RE = re.compile(r'\s*([^\s=]*)(=?)')
+WHITESPACE_RE = re.compile(r'\s')
+CONTENT_PLACEHOLDER = 'verto-content-{}'
+CONTENT_PLACEHOLDER_RE = re.compile(r'verto-content-(\d+)')
+ROOT_TAG_RE = re.compile(r'\s*<([\w-]+)')
+# Processors whose rendered html is not changed by later processors
+VERBATIM_PROCESSORS = frozenset({'button-link', 'iframe', 'image-tag', 'table-of-contents', 'video'})
+
+
+def tokenize_arguments(arguments):
+    '''Splits a string of all arguments into arguments with values
+    (given as key="value") and flags (given as key) in a single pass.
+    Double quotes within a value are escaped with a backslash. If an
+    argument is given more than once, the first value is used.
 
     Args:
-        argument_key: The name of the argument.
         arguments: A string of the argument inputs.
-        default: The default value if not found.
     Returns:
-        Value of an argument as a string if found, otherwise None.
+        A tuple of a dictionary of argument names to values, where the
+        value is None if it is not contained in double quotes, and a
+        set of flag names.
     '''
-    is_argument = re.search(r'(^|\s+){}='.format(argument_key), arguments)
-    if not is_argument:
-        return default
+    values = {}
+    flags = set()
+    position = 0
+    length = len(arguments)
+    while position < length:
+        match = ARGUMENT_NAME_RE.match(arguments, position)
+        name, equals = match.groups()
+        position = match.end()
+        if not equals:
+            if name:
+                flags.add(name)
+            continue
+
+        value = None
+        if position < length and arguments[position] == '"':
+            value_start = position + 1
+            value_end = arguments.find('"', value_start)
+            escaped_end = -1
+            while value_end != -1 and arguments[value_end - 1] == '\\':
+                escaped_end = value_end
+                value_end = arguments.find('"', value_end + 1)
+            if value_end == -1:
+                # An escaped quote ends the value if no other quote does
+                value_end = escaped_end
+            if value_end != -1:
+                value = arguments[value_start:value_end].replace(r'\"', '"')
+                position = value_end + 1
+        if name not in values:
+            values[name] = value
 
-    result = re.match(r'(^|\s+){}="([^"]*("(?<=\\")[^"]*)*)"'.format(argument_key), arguments[is_argument.start():])
+        # Arguments are separated by whitespace
+        whitespace = WHITESPACE_RE.search(arguments, position)
+        position = whitespace.start() if whitespace is not None else length
+    return values, flags
 
-    if is_argument and result is None:
+
+def argument_value(argument_key, values, default=None):
+    '''Returns the value of the given argument from tokenized
+    arguments (see tokenize_arguments).
+
+    Args:
+        argument_key: The name of the argument.
+        values: A dictionary of argument names to values.
+        default: The default value if not found.
+    Returns:
+        Value of an argument as a string if found, otherwise the default.
+    Raises:
+        ArgumentDefinitionError: If the argument is found but the value
+            is not contained in double quotes.
+    '''
+    if argument_key not in values:
+        return default
+    value = values[argument_key]
+    if value is None:
         msg = "Argument found but value not contained in double quotes."
         raise ArgumentDefinitionError(argument_key, msg)
+    return value
 
-    if result:
-        argument_value = result.group(2).replace(r'\"', r'"')
-        return argument_value
-    else:
-        return default
+
+def parse_argument(argument_key, arguments, default=None):
+    '''Search for the given argument in a string of all arguments
+
+    Args:
+        argument_key: The name of the argument.
+        arguments: A string of the argument inputs.
+        default: The default value if not found.
+    Returns:
+        Value of an argument as a string if found, otherwise None.
+    '''
+    values, flags = tokenize_arguments(arguments)
+    return argument_value(argument_key, values, default)
 
 
 def parse_flag(argument_key, arguments, default=False):
@@ -44,8 +115,8 @@ def parse_flag(argument_key, arguments, default=False):
     Returns:
         True if argument is found, otherwise None.
     '''
-    result = re.search(r'(^|\s+){}(.+?".*?")'.format(argument_key), arguments)
-    if result:
+    values, flags = tokenize_arguments(arguments)
+    if argument_key in flags:
         return True
     else:
         return default
@@ -65,23 +136,23 @@ def parse_arguments(processor, inputs, arguments):
         ArgumentMissingError: If any required arguments are missing or
         an argument an optional argument is dependent on is missing.
     '''
+    values, flags = tokenize_arguments(inputs)
     argument_values = defaultdict(None)
     for argument, argument_info in arguments.items():
         is_required = argument_info['required']
-        is_arg = parse_argument(argument, inputs, None) is not None  # True if in line
+        value = argument_value(argument, values)
+        is_arg = value is not None  # True if in line
 
         if is_required and not is_arg:  # required argument and not in line
             raise ArgumentMissingError(processor, argument, '{} is a required argument.'.format(argument))
         elif not is_required and is_arg:
             dependencies = argument_info.get('dependencies', [])
             for other_argument in dependencies:
-                if (parse_argument(other_argument, inputs, None) is None and
-                   parse_flag(other_argument, inputs, None) is None):
-                        message = '{} is a required argument because {} exists.'.format(other_argument, argument)
-                        raise ArgumentMissingError(processor, argument, message)
+                if argument_value(other_argument, values) is None and other_argument not in flags:
+                    message = '{} is a required argument because {} exists.'.format(other_argument, argument)
+                    raise ArgumentMissingError(processor, argument, message)
 
         if is_arg:
-            value = parse_argument(argument, inputs, None)
             if value and value.strip() == '':
                 message = '{} cannot be blank.'.format(argument)
                 raise ArgumentValueError(processor, argument, value, message)
@@ -94,6 +165,8 @@ def parse_arguments(processor, inputs, arguments):
 
 def process_parameters(ext, processor, parameters, argument_values):
     '''Processes a given set of arguments by the parameter definitions.
+    Processors should compile their parameter definitions once with
+    compile_parameters instead.
 
     Args:
         processor: The processor of the given arguments.
@@ -102,48 +175,131 @@ def process_parameters(ext, processor, parameters, argument_values):
     Returns:
         A dictionary of parameter to converted values.
     '''
-    context = dict()
-    transformations = OrderedDict()
-    for parameter, parameter_info in parameters.items():
-        argument_name = parameter_info['argument']
-        parameter_default = parameter_info.get('default', None)
-        argument_value = argument_values.get(argument_name, parameter_default)
+    return compile_parameters(ext, parameters)(argument_values)
+
 
-        parameter_value = argument_value
+def compile_parameters(ext, parameters):
+    '''Compiles parameter definitions into a function which processes
+    a given set of arguments, so transformations and conditions are
+    only found once for each processor.
+
+    Args:
+        ext: An instance of the Verto Extension.
+        parameters: A dictionary of parameter definitions, or None.
+    Returns:
+        A function which takes a dictionary of argument to values, and
+        returns a dictionary of parameter to converted values.
+    '''
+    defaults = []
+    transformations = []
+    for parameter, parameter_info in (parameters or {}).items():
+        defaults.append((parameter, parameter_info['argument'], parameter_info.get('default', None)))
         if parameter_info.get('transform', None):
             transform = find_transformation(ext, parameter_info['transform'])
+            condition = None
             if parameter_info.get('transform_condition', None):
-                transformations[parameter] = (eval(parameter_info['transform_condition']), transform)
-            else:
-                transformations[parameter] = (True, transform)
-
-        context[parameter] = parameter_value
+                condition = compile_condition(parameter_info['transform_condition'])
+                if condition is True:
+                    condition = None
+                elif not callable(condition):
+                    continue
+            transformations.append((parameter, condition, transform))
 
-    for parameter, (condition, transform) in transformations.items():
-        if context[parameter] is not None:
-            if isinstance(condition, bool) and condition:
+    def process(argument_values):
+        context = {parameter: argument_values.get(argument, default) for parameter, argument, default in defaults}
+        # Transformations are applied in order, so conditions see earlier transformations
+        for parameter, condition, transform in transformations:
+            if context[parameter] is not None and (condition is None or condition(context)):
                 context[parameter] = transform(context[parameter])
-            if callable(condition) and condition(context):
-                context[parameter] = transform(context[parameter])
-    return context
+        return context
+    return process
+
+
+@lru_cache(maxsize=None)
+def compile_condition(condition):
+    '''Evaluates a transform condition, which is shared by all
+    processors using the same condition.
+
+    Args:
+        condition: A string of a Python expression, usually a lambda
+            taking the context of the parameters.
+    Returns:
+        The evaluated condition.
+    '''
+    return eval(condition)
 
 
 def find_transformation(ext, option):
-    '''Returns a transformation for a given string.
-    TODO:
-    In future should be able to combine piped transformations
-    into a single function.
+    '''Returns a transformation for a given string. Transformations
+    may be combined by separating them with a pipe (e.g. 'str.lower |
+    relative_file_link'), where they are applied from left to right.
 
     Args:
         option: The desired transformations.
     Returns:
-        A function of the transformation.
+        A function of the transformation, or None if a transformation
+        does not exist.
     '''
-    return {
-        'str.lower': lambda x: x.lower(),
-        'str.upper': lambda x: x.upper(),
-        'relative_file_link': lambda x: ext.jinja_templates['relative-file-link'].render({'file_path': x})
-    }.get(option, None)
+    transformations = {
+        'str.lower': str.lower,
+        'str.upper': str.upper,
+        'relative_file_link': partial(relative_file_link, ext)
+    }
+    pipeline = [transformations.get(name.strip(), None) for name in option.split('|')]
+    if None in pipeline:
+        return None
+    if len(pipeline) == 1:
+        return pipeline[0]
+
+    def transform(value):
+        for transformation in pipeline:
+            value = transformation(value)
+        return value
+    return transform
+
+
+def relative_file_link(ext, file_path):
+    '''Renders the given file path as a link relative to the site.
+
+    Args:
+        ext: An instance of the Verto Extension.
+        file_path: A string of the path to the file.
+    Returns:
+        A string of the rendered link.
+    '''
+    return render_file_link(ext.jinja_templates['relative-file-link'], file_path)
+
+
+@lru_cache(maxsize=1024)
+def render_file_link(template, file_path):
+    '''Renders the given file path with the given template, where
+    the result is reused for the same template and file path.
+
+    Args:
+        template: The compiled relative-file-link template.
+        file_path: A string of the path to the file.
+    Returns:
+        A string of the rendered link.
+    '''
+    return template.render({'file_path': file_path})
+
+
+def may_contain_tag(md, tag_argument, block):
+    '''Returns whether the given block may contain a tag, without
+    searching the block if the tag is not in the document (see
+    TagIndexPreprocessor).
+
+    Args:
+        md: The markdown instance converting the block.
+        tag_argument: The name given at the beginning of the tag.
+        block: A string of markdown text.
+    Returns:
+        False if the block cannot contain the tag, otherwise True.
+    '''
+    tag_names = getattr(md, 'verto_tag_names', None)
+    if isinstance(tag_names, frozenset) and tag_argument not in tag_names:
+        return False
+    return '{' + tag_argument in block
 
 
 def blocks_to_string(blocks):
@@ -156,3 +312,100 @@ def blocks_to_string(blocks):
         A string of the document.
     '''
     return '\n\n'.join(blocks).rstrip('\n')
+
+
+def append_template(ext, md, processor, parent, fragment):
+    '''Appends the html rendered by the template of a processor to the
+    parent element. If the extension keeps templates verbatim, the html
+    of processors in VERBATIM_PROCESSORS is stored in the html stash of
+    markdown instead, so it is not parsed into elements only to be
+    serialized again.
+
+    Args:
+        ext: An instance of the VertoExtension.
+        md: The markdown instance converting the document.
+        processor: The name of the processor which rendered the html.
+        parent: The element to append the html to.
+        fragment: The RenderedFragment of the template.
+    '''
+    if ext.verbatim_templates and processor in VERBATIM_PROCESSORS:
+        html_string = fragment.html_string
+        # Block level html is followed by a newline, as it would be
+        # when serialized
+        match = ROOT_TAG_RE.match(html_string)
+        if match is not None and isBlockLevel(match.group(1)):
+            html_string += '\n'
+        # Remove tags are removed by the OutputPostprocessor
+        node = etree.SubElement(parent, 'remove')
+        node.text = AtomicString(md.htmlStash.store(html_string))
+    else:
+        parent.append(fragment.element())
+
+
+def content_placeholder(index):
+    '''
+    Args:
+        index: The index of the content in the list of contents given
+            to splice_contents.
+    Returns:
+        A string of the html comment given to a template in place of
+        the content.
+    '''
+    return '<!--{}-->'.format(CONTENT_PLACEHOLDER.format(index))
+
+
+def splice_contents(html_string, contents):
+    '''Parses the html of a template rendered with content placeholders
+    (see content_placeholder), replacing each placeholder with the
+    elements of its content. This avoids serializing content which has
+    already been parsed into elements and parsing it again, once for
+    each container it is nested within.
+
+    Args:
+        html_string: A string of the rendered template.
+        contents: A list of lists of elements, where the elements of
+            each content replace the placeholder of its index.
+    Returns:
+        The root element of the html, or None if the placeholder of
+        each content is not in the html exactly once as a comment
+        (e.g. the template escapes or changes the content), where the
+        template must be rendered with serialized content instead.
+    '''
+    for index in range(len(contents)):
+        if html_string.count(CONTENT_PLACEHOLDER.format(index)) != 1:
+            return None
+    root = HtmlParser.fromstring(html_string)
+
+    placeholders = []
+    for parent in root.iter():
+        for position, child in enumerate(parent):
+            if child.tag is etree.Comment:
+                match = CONTENT_PLACEHOLDER_RE.fullmatch(child.text or '')
+                if match is not None and int(match.group(1)) < len(contents):
+                    placeholders.append((parent, position, int(match.group(1))))
+    if len(placeholders) != len(contents):
+        return None
+
+    # Replaced from the last placeholder, so positions are not moved
+    for parent, position, index in reversed(placeholders):
+        placeholder = parent[position]
+        elements = contents[index]
+        parent[position:position + 1] = elements
+        if placeholder.tail:
+            if elements:
+                elements[-1].tail = (elements[-1].tail or '') + placeholder.tail
+            elif position > 0:
+                parent[position - 1].tail = (parent[position - 1].tail or '') + placeholder.tail
+            else:
+                parent.text = (parent.text or '') + placeholder.tail
+    return root
+
+
+def serialize_contents(elements):
+    '''
+    Args:
+        elements: A list of elements of a content.
+    Returns:
+        A string of the html of the elements, including their tails.
+    '''
+    return HtmlSerializer.tostrings(elements)
@@ -4,6 +4,7 @@ from unittest.mock import Mock
 from verto.VertoExtension import VertoExtension
 from verto.processors.GenericContainerBlockProcessor import GenericContainerBlockProcessor
 from verto.errors.ArgumentMissingError import ArgumentMissingError
+from verto.errors.TagNotMatchedError import TagNotMatchedError
 from verto.tests.ProcessorTest import ProcessorTest
 
 
@@ -36,6 +37,17 @@ class BoxedTextTest(ProcessorTest):
         expected_string = self.read_test_file(self.processor_name, 'no_boxed_text_expected.html', strip=True)
         self.assertEqual(expected_string, converted_test_string)
 
+    def test_longer_tag_name(self):
+        '''Tests that a tag name starting with the processor name is
+        still matched, and raises an error as there is no end tag.
+        '''
+        test_string = self.read_test_file(self.processor_name, 'longer_tag_name.md')
+        blocks = self.to_blocks(test_string)
+
+        self.assertListEqual([True, False], [self.block_processor.test(blocks, block) for block in blocks], msg='"{}"'.format(test_string))
+
+        self.assertRaises(TagNotMatchedError, lambda x: markdown.markdown(x, extensions=[self.verto_extension]), test_string)
+
     def test_single_boxed_text(self):
         '''Tests that the most generic case of a single match is found with generic content contained within.
         '''
@@ -108,6 +120,19 @@ class BoxedTextTest(ProcessorTest):
         expected_string = self.read_test_file(self.processor_name, 'recursive_boxed_text_expected.html', strip=True)
         self.assertEqual(expected_string, converted_test_string)
 
+    def test_recursive_boxed_text_code_block(self):
+        '''Tests that the content of nested boxed text is not parsed
+        again, so code blocks are kept as code.
+        '''
+        test_string = self.read_test_file(self.processor_name, 'recursive_boxed_text_code_block.md')
+        blocks = self.to_blocks(test_string)
+
+        self.assertListEqual([True, True, False, False, True, True], [self.block_processor.test(blocks, block) for block in blocks], msg='"{}"'.format(test_string))
+
+        converted_test_string = markdown.markdown(test_string, extensions=[self.verto_extension])
+        expected_string = self.read_test_file(self.processor_name, 'recursive_boxed_text_code_block_expected.html', strip=True)
+        self.assertEqual(expected_string, converted_test_string)
+
     def test_indented_value_no(self):
         '''Tests that indented class not added if indent value is "no".
         '''
@@ -1,9 +1,21 @@
+import asyncio
 import markdown
-
+from concurrent.futures import ThreadPoolExecutor
+import io
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+
+from verto.AsyncVerto import AsyncVerto
+from verto.IncrementalVerto import IncrementalVerto
 from verto.Verto import Verto, VertoResult
 from verto.VertoExtension import VertoExtension
 from verto.processors.ScratchTreeprocessor import ScratchImageMetaData
 from verto.utils.HeadingNode import HeadingNode
+from verto.utils.ResultCache import ResultCache, SIZE_CHECK_SECONDS
 from verto.tests.BaseTest import BaseTest
 from verto.errors.ArgumentMissingError import ArgumentMissingError
 from verto.errors.CustomArgumentRulesError import CustomArgumentRulesError
@@ -292,6 +304,431 @@ class ConfigurationTest(BaseTest):
         expected_string = self.read_test_file(self.test_name, 'all_processors_except_comment_expected.html', strip=True)
         self.assertEqual(expected_string, converted_test_string)
 
+    def test_reconfigure_without_rebuilding(self):
+        '''Checks that changing templates and processors keeps the
+        Markdown instance and gives the same output as a new converter.
+        '''
+        verto = Verto()
+        converter = verto.converter
+        test_string = self.read_test_file(self.test_name, 'all_processors.md')
+
+        verto.update_templates(self.custom_templates)
+        converted_test_string = verto.convert(test_string).html_string
+        expected_string = self.read_test_file(self.test_name, 'all_processors_custom_html_expected.html', strip=True)
+        self.assertEqual(expected_string, converted_test_string)
+
+        verto.clear_saved_data()
+        verto.clear_templates()
+        processors = Verto.processor_defaults()
+        processors.remove('comment')
+        verto.update_processors(processors)
+        converted_test_string = verto.convert(test_string).html_string
+        expected_string = self.read_test_file(self.test_name, 'all_processors_except_comment_expected.html', strip=True)
+        self.assertEqual(expected_string, converted_test_string)
+
+        verto.update_processors(Verto.processor_defaults())
+        verto.convert(test_string)
+        self.assertIs(converter, verto.converter)
+        new_converter = Verto().converter
+        for md in (converter, new_converter):
+            md.registry_keys = [
+                list(registry.keys()) for registry in (
+                    md.preprocessors, md.parser.blockprocessors, md.inlinePatterns,
+                    md.treeprocessors, md.postprocessors
+                )
+            ]
+        self.assertEqual(new_converter.registry_keys, converter.registry_keys)
+
+    def test_convert_with_overrides(self):
+        '''Checks that configuration given for a single conversion
+        matches a converter created with that configuration, and does
+        not change the converter.
+        '''
+        verto = Verto()
+        test_string = self.read_test_file(self.test_name, 'all_processors.md')
+        processors = Verto.processor_defaults()
+        processors.remove('comment')
+
+        converted_test_string = verto.convert(test_string, processors=processors).html_string
+        expected_string = self.read_test_file(self.test_name, 'all_processors_except_comment_expected.html', strip=True)
+        self.assertEqual(expected_string, converted_test_string)
+
+        verto.clear_saved_data()
+        converted_test_string = verto.convert(test_string, html_templates=self.custom_templates).html_string
+        expected_string = self.read_test_file(self.test_name, 'all_processors_custom_html_expected.html', strip=True)
+        self.assertEqual(expected_string, converted_test_string)
+
+        verto.clear_saved_data()
+        converted_test_string = verto.convert(test_string).html_string
+        expected_string = self.read_test_file(self.test_name, 'all_processors_expected.html', strip=True)
+        self.assertEqual(expected_string, converted_test_string)
+        self.assertEqual(Verto.processor_defaults(), verto.verto_extension.processors)
+
+        test_string = '{image file-path="http://placehold.it/350x150"}'
+        custom_argument_rules = {'image-tag': {'alt': False}}
+        verto.convert(test_string, custom_argument_rules=custom_argument_rules)
+        self.assertRaises(ArgumentMissingError, lambda: verto.convert(test_string))
+        self.assertRaises(
+            CustomArgumentRulesError,
+            lambda: verto.convert(test_string, processors={'comment'}, custom_argument_rules=custom_argument_rules)
+        )
+
+    def test_convert_many(self):
+        '''Checks that converting documents in worker processes matches
+        converting them one at a time and merges saved data in order.
+        '''
+        filenames = ['all_processors.md', 'some_processors.md', 'some_processors_2.md', 'otherfile.md']
+        test_strings = [self.read_test_file(self.test_name, filename) for filename in filenames]
+
+        verto = Verto()
+        expected_results = []
+        for test_string in test_strings:
+            verto.clear_saved_data()
+            expected_results.append(verto.convert(test_string))
+
+        verto = Verto()
+        verto_results = verto.convert_many(test_strings, workers=2)
+        self.assertEqual(len(expected_results), len(verto_results))
+        for expected_result, verto_result in zip(expected_results, verto_results):
+            self.assertEqual(expected_result.html_string, verto_result.html_string)
+            self.assertEqual(expected_result.title, verto_result.title)
+            self.assertTupleEqual(expected_result.heading_tree, verto_result.heading_tree)
+
+        expected_images = {
+            'totally-legit-image.png',
+            'finite-state-automata-no-trap-example.png',
+            'finite-state-automata-trap-added-example.png',
+            'finite-state-automata-trap-added-extreme-example.png',
+            'pixel-diamond.png',
+        }
+        self.assertSetEqual(expected_images, verto_results[-1].required_files['images'])
+        self.assertEqual(
+            [('computer program', 'glossary-algorithm'),
+             ('algorithm cost', 'glossary-algorithm-2'),
+             ('searching algorithms', 'glossary-algorithm-3'),
+             ('sorting algorithms', 'glossary-algorithm-4')],
+            verto_results[-1].required_glossary_terms['algorithm'])
+        self.assertIn('example-title-2', verto.verto_extension.custom_slugify.uids)
+
+    def test_convert_many_single_worker_in_threads(self):
+        '''Checks that converting documents without worker processes
+        uses a copy of each converter, so converters used by multiple
+        threads at once do not convert with each other's configuration.
+        '''
+        test_string = '{boxed-text}\n\nHi\n\n{boxed-text end}'
+        converters = [Verto(), Verto(processors=set())]
+        expected_strings = [converter.convert(test_string).html_string for converter in converters]
+        self.assertNotEqual(*expected_strings)
+
+        def convert_many(index):
+            return [result.html_string for result in converters[index].convert_many([test_string] * 20, workers=1)]
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            for _ in range(5):
+                html_strings = list(executor.map(convert_many, [0, 1]))
+                self.assertEqual([[expected_strings[0]] * 20, [expected_strings[1]] * 20], html_strings)
+        self.assertIsNone(sys.modules[Verto.__module__]._worker_converter)
+
+    def test_convert_in_threads(self):
+        '''Checks that one converter can be used by multiple threads
+        at once, with each conversion keeping its own document data.
+        '''
+        filenames = ['all_processors.md', 'some_processors.md', 'some_processors_2.md', 'otherfile.md']
+        test_strings = [self.read_test_file(self.test_name, filename) for filename in filenames] * 4
+        # Slugs depend on the order documents finish in
+        processors = Verto.processor_defaults() - {'heading', 'glossary-link'}
+
+        verto = Verto(processors=processors)
+        expected_results = [verto.convert(test_string) for test_string in test_strings]
+
+        verto = Verto(processors=processors)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            verto_results = list(executor.map(verto.convert, test_strings))
+        for expected_result, verto_result in zip(expected_results, verto_results):
+            self.assertEqual(expected_result.html_string, verto_result.html_string)
+            self.assertEqual(expected_result.title, verto_result.title)
+        self.assertEqual(expected_results[-1].required_files, verto.verto_extension.required_files)
+
+    def test_async_convert(self):
+        '''Checks that converting documents with AsyncVerto matches
+        converting them one at a time.
+        '''
+        filenames = ['all_processors.md', 'some_processors.md', 'some_processors_2.md']
+        test_strings = [self.read_test_file(self.test_name, filename) for filename in filenames]
+        processors = Verto.processor_defaults() - {'heading', 'glossary-link'}
+        expected_results = [Verto(processors=processors).convert(test_string) for test_string in test_strings]
+
+        async def convert_all(converter):
+            results = await converter.convert_many(test_strings)
+            completed = [index async for index, result in converter.as_completed(test_strings)]
+            return results, completed
+
+        async_verto = AsyncVerto(Verto(processors=processors), max_concurrency=2)
+        loop = asyncio.new_event_loop()
+        verto_results, completed = loop.run_until_complete(convert_all(async_verto))
+        loop.close()
+        async_verto.close()
+        for expected_result, verto_result in zip(expected_results, verto_results):
+            self.assertEqual(expected_result.html_string, verto_result.html_string)
+            self.assertEqual(expected_result.title, verto_result.title)
+        self.assertEqual([0, 1, 2], sorted(completed))
+
+    def test_async_convert_timeout(self):
+        '''Checks that a conversion that times out is not added to the
+        data saved between documents.
+        '''
+        test_string = self.read_test_file(self.test_name, 'some_processors.md')
+        async_verto = AsyncVerto()
+        loop = asyncio.new_event_loop()
+        conversion = async_verto.convert(test_string, timeout=0)
+        self.assertRaises(asyncio.TimeoutError, loop.run_until_complete, conversion)
+        loop.close()
+        async_verto.close()
+        self.assertSetEqual(set(), async_verto.converter.verto_extension.required_files['images'])
+
+    def test_async_convert_concurrency(self):
+        '''Checks that a conversion which times out holds its slot until
+        it ends, so no more than max_concurrency conversions run at once
+        on a larger executor.
+        '''
+        converter = Verto()
+        convert = converter._convert
+        lock = threading.Lock()
+        running = []
+        peak_running = []
+
+        def slow_convert(text, context):
+            with lock:
+                running.append(text)
+                peak_running.append(len(running))
+            time.sleep(0.1)
+            try:
+                return convert(text, context)
+            finally:
+                with lock:
+                    running.remove(text)
+
+        async def convert_all(async_verto):
+            conversions = [async_verto.convert('# First', timeout=0.02)]
+            conversions.extend(async_verto.convert('# Document {}'.format(number), timeout=10) for number in range(3))
+            return await asyncio.gather(*conversions, return_exceptions=True)
+
+        converter._convert = slow_convert
+        executor = ThreadPoolExecutor(max_workers=4)
+        async_verto = AsyncVerto(converter, max_concurrency=1, executor=executor)
+        loop = asyncio.new_event_loop()
+        results = loop.run_until_complete(convert_all(async_verto))
+        loop.close()
+        executor.shutdown(wait=True)
+        self.assertIsInstance(results[0], asyncio.TimeoutError)
+        self.assertEqual(['document-0', 'document-1', 'document-2'], [r.heading_tree[0].title_slug for r in results[1:]])
+        self.assertEqual(1, max(peak_running))
+
+    def test_result_cache(self):
+        '''Checks that cached results match converted results, and are
+        not reused when the configuration changes.
+        '''
+        test_string = self.read_test_file(self.test_name, 'all_processors.md')
+        expected_result = Verto().convert(test_string)
+        custom_result = Verto(html_templates=self.custom_templates).convert(test_string)
+
+        with tempfile.TemporaryDirectory() as directory:
+            Verto(cache=ResultCache(directory)).convert(test_string)
+            verto = Verto(cache=ResultCache(directory))
+            verto._convert_markdown = None  # Fails if the cache is not used
+            verto_result = verto.convert(test_string)
+            self.assertEqual(expected_result.html_string, verto_result.html_string)
+            self.assertEqual(expected_result.title, verto_result.title)
+            self.assertTupleEqual(expected_result.heading_tree, verto_result.heading_tree)
+            self.assertEqual(expected_result.required_files, verto_result.required_files)
+            self.assertEqual(expected_result.required_glossary_terms, verto_result.required_glossary_terms)
+            self.assertIn('example-title-2', verto.verto_extension.custom_slugify.uids)
+
+            verto = Verto(html_templates=self.custom_templates, cache=ResultCache(directory))
+            self.assertEqual(custom_result.html_string, verto.convert(test_string).html_string)
+
+    def test_result_cache_eviction(self):
+        '''Checks that the least recently used entries are removed when
+        the cache is full.
+        '''
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResultCache(directory, max_size=250)
+            for key in ['a', 'b', 'c']:
+                cache.set(key, 'x' * 100)
+                os.utime(os.path.join(directory, key + '.pickle'), (0, ord(key)))
+            self.assertIsNone(cache.get('a'))
+            self.assertEqual('x' * 100, cache.get('b'))
+            self.assertEqual('x' * 100, cache.get('c'))
+
+    def test_result_cache_size(self):
+        '''Checks that replaced entries are not counted twice, that
+        entries written by other caches sharing the directory are
+        counted when the size is checked, and that stale temporary
+        files are removed.
+        '''
+        def directory_size(directory):
+            return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResultCache(directory, max_size=300)
+            cache.set('a', 'x' * 100)
+            cache.set('a', 'x' * 100)
+            self.assertEqual(directory_size(directory), cache.size)
+
+            other_cache = ResultCache(directory, max_size=300)
+            other_cache.set('b', 'x' * 100)
+            cache.size_checked_at -= SIZE_CHECK_SECONDS
+            cache.set('c', 'x' * 100)
+            self.assertLessEqual(directory_size(directory), 300)
+            self.assertEqual(directory_size(directory), cache.size)
+
+            stale_path = os.path.join(directory, 'stale.tmp')
+            recent_path = os.path.join(directory, 'recent.tmp')
+            for path in (stale_path, recent_path):
+                with open(path, 'wb') as f:
+                    f.write(b'x')
+            os.utime(stale_path, (0, 0))
+            cache.evict()
+            self.assertFalse(os.path.exists(stale_path))
+            self.assertTrue(os.path.exists(recent_path))
+
+    def test_incremental_convert(self):
+        '''Checks that incremental conversions match converting the whole
+        document, and only convert the changed parts of the document.
+        '''
+        filenames = ['all_processors.md', 'some_processors.md', 'some_processors_2.md']
+        test_string = '\n\n'.join(self.read_test_file(self.test_name, filename) for filename in filenames)
+        test_string += '\n\n## Example Title\n\nAn extra paragraph.\n\n## Example Title\n\nThe last paragraph.\n'
+        edited_strings = [
+            test_string,
+            test_string.replace('An extra paragraph.', 'An edited paragraph.'),
+            test_string.replace('## Example Title\n\nAn extra', '## Edited Title\n\nAn extra'),
+        ]
+
+        incremental_verto = IncrementalVerto(Verto())
+        converted_segments = []
+        for edited_string in edited_strings:
+            expected_result = Verto().convert(edited_string)
+            verto_result = incremental_verto.convert(edited_string)
+            converted_segments.append(incremental_verto.converted_segments)
+            self.assertEqual(expected_result.html_string, verto_result.html_string)
+            self.assertEqual(expected_result.title, verto_result.title)
+            self.assertTupleEqual(expected_result.heading_tree, verto_result.heading_tree)
+            self.assertEqual(expected_result.required_files, verto_result.required_files)
+            self.assertEqual(expected_result.required_glossary_terms, verto_result.required_glossary_terms)
+        self.assertGreater(converted_segments[0], 2)
+        # Renaming the heading changes the slug of the following heading
+        self.assertEqual([1, 2], converted_segments[1:])
+
+    def test_convert_stream(self):
+        '''Checks that converting a document from a file object matches
+        converting the whole document, and saves the data of the
+        document.
+        '''
+        filenames = ['all_processors.md', 'some_processors.md', 'some_processors_2.md']
+        test_string = '\n\n'.join(self.read_test_file(self.test_name, filename) for filename in filenames)
+        test_string += '\n\n## Example Title\n\nAn extra paragraph.\n\n## Example Title\n\nThe last paragraph.\n'
+        verto = Verto()
+        expected_result = verto.convert(test_string)
+        verto.clear_saved_data()
+
+        writable = io.StringIO()
+        verto_result = verto.convert_stream(io.StringIO(test_string), writable)
+        self.assertEqual(expected_result.html_string, writable.getvalue())
+        self.assertIsNone(verto_result.html_string)
+        self.assertEqual(expected_result.title, verto_result.title)
+        self.assertTupleEqual(expected_result.heading_tree, verto_result.heading_tree)
+        self.assertEqual(expected_result.required_files, verto_result.required_files)
+        self.assertEqual(expected_result.required_glossary_terms, verto_result.required_glossary_terms)
+        self.assertIn('example-title-2', verto.verto_extension.custom_slugify.uids)
+
+    def test_pickle_converter(self):
+        '''Checks that a configured converter can be pickled, keeping
+        its configuration and saved data.
+        '''
+        processors = {'image-tag', 'boxed-text', 'heading'}
+        verto = Verto(processors=processors, html_templates=self.custom_templates)
+        test_string = self.read_test_file(self.test_name, 'all_processors.md')
+        verto_result = verto.convert(test_string)
+
+        unpickled_verto = pickle.loads(pickle.dumps(verto))
+        self.assertEqual(processors, unpickled_verto.verto_extension.processors)
+        self.assertEqual(verto.verto_extension.custom_slugify.uids, unpickled_verto.verto_extension.custom_slugify.uids)
+
+        verto.clear_saved_data()
+        unpickled_verto.clear_saved_data()
+        unpickled_result = unpickled_verto.convert(test_string)
+        self.assertEqual(verto_result.html_string, unpickled_result.html_string)
+
+    def test_custom_block_level_elements(self):
+        '''Checks that raw html of custom block level elements is not
+        wrapped in paragraphs, and the elements are kept when pickled.
+        '''
+        test_string = 'Hi\n\n<custom-element>\n\nThere'
+        verto = Verto()
+        self.assertEqual('<p>Hi</p>\n<p><custom-element></p>\n<p>There</p>', verto.convert(test_string).html_string)
+
+        verto = Verto(block_level_elements=['p', 'custom-element'])
+        self.assertEqual('<p>Hi</p>\n<custom-element>\n\n<p>There</p>', verto.convert(test_string).html_string)
+        unpickled_verto = pickle.loads(pickle.dumps(verto))
+        self.assertEqual(['p', 'custom-element'], unpickled_verto.verto_extension.block_level_classifier.block_level_elements)
+        self.assertNotEqual(Verto().configuration_fingerprint(), verto.configuration_fingerprint())
+
+    def test_verbatim_templates(self):
+        '''Checks that the html of templates is output as rendered when
+        verbatim templates are used, and that this is kept when pickled.
+        '''
+        test_string = 'Hi\n\n{button-link link="http://www.example.com" text="Example"}\n\n{iframe link="https://www.example.com"}\n\nThere'
+        verto = Verto()
+        self.assertEqual(
+            '<p>Hi</p>\n<a class="button" href="http://www.example.com">Example</a><iframe src="https://www.example.com">\n'
+            '<p>Your browser does not support iframes.</p>\n</iframe>\n<p>There</p>',
+            verto.convert(test_string).html_string
+        )
+
+        verto = Verto(verbatim_templates=True)
+        self.assertEqual(
+            '<p>Hi</p>\n<a class=\'button\' href=\'http://www.example.com\'>Example</a><iframe src="https://www.example.com">\n'
+            '<p>Your browser does not support iframes.</p>\n</iframe>\n<p>There</p>',
+            verto.convert(test_string).html_string
+        )
+        unpickled_verto = pickle.loads(pickle.dumps(verto))
+        self.assertTrue(unpickled_verto.verto_extension.verbatim_templates)
+        self.assertNotEqual(Verto().configuration_fingerprint(), verto.configuration_fingerprint())
+
+    def test_render_cache(self):
+        '''Checks that repeated tags are rendered once, and that the
+        files they require are added to each document they are in.
+        '''
+        test_string = '{image file-path="img/example.png" alt="Example"}\n\n{image file-path="img/example.png" alt="Example"}'
+        verto = Verto()
+        verto_result = verto.convert(test_string)
+        cache_info = verto.render_cache_info()
+        self.assertEqual(1, cache_info.misses)
+        self.assertEqual(1, cache_info.hits)
+
+        verto.clear_saved_data()
+        cached_result = verto.convert(test_string)
+        self.assertEqual(3, verto.render_cache_info().hits)
+        self.assertEqual(verto_result.html_string, cached_result.html_string)
+        self.assertEqual({'img/example.png'}, cached_result.required_files['images'])
+
+        verto.update_templates({'image': '<img src="{{ full_file_path }}">'})
+        self.assertEqual('<img src="img/example.png" /><img src="img/example.png" />', verto.convert(test_string).html_string)
+        self.assertEqual(1, verto.render_cache_info().misses)
+
+    def test_reconfiguring_clears_saved_data(self):
+        '''Checks that updating templates or processors clears the data
+        saved between documents, such as slugs.
+        '''
+        verto = Verto()
+        for reconfigure in [lambda: verto.update_templates({}), verto.clear_templates,
+                            lambda: verto.update_processors(Verto.processor_defaults())]:
+            verto.convert('# Heading')
+            reconfigure()
+            self.assertEqual('heading', verto.convert('# Heading').heading_tree[0].title_slug)
+            verto.clear_saved_data()
+
     def test_unique_custom_processors(self):
         '''Checks if unique processors are stored when duplicates provided.
         '''
@@ -305,6 +742,19 @@ class ConfigurationTest(BaseTest):
         verto.update_processors(processors)
         self.assertTrue(verto.verto_extension.processors, processors)
 
+    def test_templates_shared_between_converters(self):
+        '''Checks that converters share compiled default and custom
+        templates.
+        '''
+        verto = Verto(html_templates=self.custom_templates)
+        other_verto = Verto(html_templates=self.custom_templates)
+        templates = verto.verto_extension.jinja_templates
+        other_templates = other_verto.verto_extension.jinja_templates
+        self.assertIs(templates['image'], other_templates['image'])
+        self.assertIs(templates['heading'], other_templates['heading'])
+        self.assertIs(templates['heading'], Verto().verto_extension.jinja_templates['heading'])
+        self.assertIsNot(templates['image'], Verto().verto_extension.jinja_templates['image'])
+
     def test_custom_templates_on_creation(self):
         '''Checks custom templates are used when given on creation.
         '''
@@ -5,6 +5,7 @@ from verto.VertoExtension import VertoExtension
 from verto.processors.HeadingBlockProcessor import HeadingBlockProcessor
 from verto.tests.ProcessorTest import ProcessorTest
 from verto.utils.HeadingNode import HeadingNode
+from verto.utils.UniqueSlugify import UniqueSlugify
 
 
 class HeadingTest(ProcessorTest):
@@ -260,3 +261,19 @@ class HeadingTest(ProcessorTest):
                     )
 
         self.assertTupleEqual(tree, expected_tree)
+
+    def test_repeated_headings(self):
+        '''Checks that many headings with the same title are given
+        unique slugs in order, and that their slugs are cached.
+        '''
+        test_string = '\n\n'.join('## Example' for _ in range(100))
+        markdown.markdown(test_string, extensions=[self.verto_extension])
+        cache_info = UniqueSlugify.cache_info()
+
+        tree = self.verto_extension.get_heading_tree()
+        expected_slugs = ['example'] + ['example-{}'.format(count) for count in range(2, 101)]
+        self.assertListEqual(expected_slugs, [node.title_slug for node in tree])
+
+        self.verto_extension.clear_saved_data()
+        markdown.markdown(test_string, extensions=[self.verto_extension])
+        self.assertGreaterEqual(UniqueSlugify.cache_info().hits, cache_info.hits + 100)
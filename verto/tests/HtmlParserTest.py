@@ -124,6 +124,21 @@ class HtmlParserTest(BaseTest):
         root_string = HtmlSerializer.tostring(root)
         self.assertEquals(input_text, root_string)
 
+    def test_example_tostrings(self):
+        '''Checks that sibling elements serialize to the same string
+        as serializing each element, including ie comments.
+        '''
+        input_text = '<div><p>Text</p>\n' + self.read_test_file('example_comment_ie.html') + '\n<p>More text</p></div>'
+        parser = HtmlParser()
+        parser.feed(input_text).close()
+        elements = list(parser.get_root())
+        self.assertEquals(3, len(elements))
+
+        expected_string = ''.join(HtmlSerializer.tostring(element) for element in elements)
+        self.assertEquals(input_text[len('<div>'):-len('</div>')], expected_string)
+        self.assertEquals(expected_string, HtmlSerializer.tostrings(elements))
+        self.assertEquals('', HtmlSerializer.tostrings([]))
+
     def test_example_data_and_subelements(self):
         '''Checks that data and subelements work together.
         '''
@@ -151,6 +166,31 @@ class HtmlParserTest(BaseTest):
         root_string = HtmlSerializer.tostring(root)
         self.assertEquals(input_text, root_string)
 
+    def test_example_fromstring(self):
+        '''Checks that parsing with fromstring, which uses the XML
+        parser for well-formed HTML, gives the same tree as the
+        HtmlParser.
+        '''
+        filenames = [
+            'example_basic_usage.html',
+            'example_comment.html',
+            'example_comment_ie.html',
+            'example_data_and_subelements.html',
+            'example_simple_closed_void_tag.html',
+            'example_simple_void_tag.html',
+        ]
+        for filename in filenames:
+            input_text = self.read_test_file(filename)
+            parser = HtmlParser()
+            parser.feed(input_text).close()
+            expected_string = HtmlSerializer.tostring(parser.get_root())
+            root = HtmlParser.fromstring(input_text)
+            self.assertEquals(expected_string, HtmlSerializer.tostring(root))
+
+        self.assertIsNotNone(HtmlParser.fromstring_xml('<div class="box">Text<!-- comment --><br/></div>'))
+        self.assertIsNone(HtmlParser.fromstring_xml('<div class="box">Text<br></div>'))
+        self.assertIsNone(HtmlParser.fromstring_xml('<DIV>Text</DIV>'))
+
     # ~
     # Invalid Examples
     # ~
@@ -207,3 +247,19 @@ class HtmlParserTest(BaseTest):
         parser = HtmlParser()
         with self.assertRaises(HtmlParseError):
             parser.feed(input_text).close()
+
+    def test_example_fromstring_error(self):
+        '''Checks that fromstring raises the same exceptions as the
+        HtmlParser for HTML the XML parser cannot parse.
+        '''
+        filenames = [
+            'example_multiple_roots_error.html',
+            'example_lone_end_tag_error.html',
+            'example_missing_end_tag_error.html',
+            'example_missing_end_tag_implicit_error.html',
+            'example_data_without_tags_error.html',
+        ]
+        for filename in filenames:
+            input_text = self.read_test_file(filename)
+            with self.assertRaises(HtmlParseError):
+                HtmlParser.fromstring(input_text)
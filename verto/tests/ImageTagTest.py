@@ -269,6 +269,29 @@ class ImageTagTest(ProcessorTest):
 
         self.assertRaises(ArgumentMissingError, lambda x: markdown.markdown(x, extensions=[self.verto_extension]), test_string)
 
+    def test_caption_link_without_caption_error(self):
+        '''Tests that ArgumentMissingError is raised when caption-link argument is given but a caption is not provided,
+        when all required arguments are given.
+        '''
+        test_string = self.read_test_file(self.processor_name, 'caption_link_without_caption_error.md')
+        blocks = self.to_blocks(test_string)
+
+        self.assertListEqual([True], [ImageTagBlockProcessor(self.ext, self.md.parser).test(blocks, block) for block in blocks], msg='"{}"'.format(test_string))
+
+        self.assertRaises(ArgumentMissingError, lambda x: markdown.markdown(x, extensions=[self.verto_extension]), test_string)
+
+    def test_escaped_quotes(self):
+        '''Tests that double quotes escaped with a backslash are kept in argument values.
+        '''
+        test_string = self.read_test_file(self.processor_name, 'escaped_quotes.md')
+        blocks = self.to_blocks(test_string)
+
+        self.assertListEqual([True], [ImageTagBlockProcessor(self.ext, self.md.parser).test(blocks, block) for block in blocks], msg='"{}"'.format(test_string))
+
+        converted_test_string = markdown.markdown(test_string, extensions=[self.verto_extension])
+        expected_string = self.read_test_file(self.processor_name, 'escaped_quotes_expected.html', strip=True)
+        self.assertEqual(expected_string, converted_test_string)
+
     def test_align_undefined_error(self):
         '''Tests that ArgumentValueError is raised when undefined align value is given.
         '''
@@ -1,4 +1,5 @@
 import markdown
+from verto.processors.OutputPostprocessor import OutputPostprocessor
 from verto.tests.ProcessorTest import ProcessorTest
 
 
@@ -20,3 +21,11 @@ class JinjaTest(ProcessorTest):
         converted_test_string = markdown.markdown(test_string, extensions=[self.verto_extension])
         expected_string = self.read_test_file(self.processor_name, 'doc_example_basic_usage_expected.html', strip=True)
         self.assertEqual(expected_string, converted_test_string)
+
+    def test_remove_tag_within_block(self):
+        '''Checks that Jinja blocks containing remove tags are
+        unescaped once the remove tags are removed.
+        '''
+        postprocessor = OutputPostprocessor(None)
+        self.assertEqual('{% if a < b %}x', postprocessor.run('{% if a &lt; b </remove>%}x'))
+        self.assertEqual('{% if a < b %}x', postprocessor.run('{% if a &lt;<remove> b %}x'))
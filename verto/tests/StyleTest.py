@@ -1,6 +1,7 @@
 import markdown
 from unittest.mock import Mock
 
+from verto.VertoExtension import VertoExtension
 from verto.errors.StyleError import StyleError
 from verto.tests.ProcessorTest import ProcessorTest
 
@@ -77,3 +78,14 @@ class StyleTest(ProcessorTest):
         '''
         test_string = self.read_test_file(self.processor_name, 'doc_example_block_error_in_list.md')
         self.assertRaises(StyleError, lambda x: markdown.markdown(x, extensions=[self.verto_extension]), test_string)
+
+    def test_trusted_input(self):
+        '''Test style rules are not checked for trusted input.
+        '''
+        test_string = self.read_test_file(self.processor_name, 'doc_example_block_whitespace.md')
+        self.assertRaises(StyleError, lambda x: markdown.markdown(x, extensions=[self.verto_extension]), test_string)
+
+        verto_extension = VertoExtension([self.processor_name], trusted_input=True)
+        converted_test_string = markdown.markdown(test_string, extensions=[verto_extension])
+        expected_string = self.read_test_file(self.processor_name, 'trusted_input_expected.html', strip=True)
+        self.assertEqual(expected_string, converted_test_string)
@@ -0,0 +1,299 @@
+import optparse
+import time
+import timeit
+from verto.Verto import Verto
+from verto.utils.HtmlParser import HtmlParser
+
+SCRATCH_EXTENSIONS = [
+    'markdown.extensions.fenced_code',
+    'markdown.extensions.codehilite',
+]
+SCRATCH_SNIPPET = '''```scratch
+when flag clicked
+say [Hello number {0}]
+move (10) steps
+```
+'''
+
+
+def scratch_chapter(snippets):
+    '''Creates a chapter with many scratch snippets, each followed by
+    a paragraph of text.
+
+    Args:
+        snippets: The number of scratch snippets in the chapter.
+    Returns:
+        A string of the Markdown document.
+    '''
+    sections = ['# Scratch Chapter\n']
+    for number in range(snippets):
+        sections.append(SCRATCH_SNIPPET.format(number))
+        sections.append('This is the explanation of snippet {}.\n'.format(number))
+    return '\n'.join(sections)
+
+
+def benchmark_scratch(snippets, repeat):
+    '''Times converting a chapter with many scratch snippets, using
+    the fenced_code and codehilite extensions.
+
+    Args:
+        snippets: The number of scratch snippets in the chapter.
+        repeat: The number of times to convert the chapter.
+    Returns:
+        The shortest time in seconds taken to convert the chapter.
+    '''
+    converter = Verto(extensions=SCRATCH_EXTENSIONS)
+    text = scratch_chapter(snippets)
+
+    def convert():
+        converter.clear_saved_data()
+        converter.convert(text)
+    return min(timeit.repeat(convert, number=1, repeat=repeat))
+
+
+def reference_list(items):
+    '''Creates a document with a long loose list, such as a list of
+    references, where each item has an indented second paragraph.
+
+    Args:
+        items: The number of items in the list.
+    Returns:
+        A string of the Markdown document.
+    '''
+    lines = ['# References\n']
+    for number in range(items):
+        lines.append('{}. Reference number {} with *emphasis*\n'.format(number + 1, number))
+        lines.append('    A description of reference {}.\n'.format(number))
+    return '\n'.join(lines)
+
+
+def benchmark_list(items, repeat):
+    '''Times converting a document with a long list.
+
+    Args:
+        items: The number of items in the list.
+        repeat: The number of times to convert the document.
+    Returns:
+        The shortest time in seconds taken to convert the document.
+    '''
+    converter = Verto()
+    text = reference_list(items)
+
+    def convert():
+        converter.clear_saved_data()
+        converter.convert(text)
+    return min(timeit.repeat(convert, number=1, repeat=repeat))
+
+
+def reference_manual(headings):
+    '''Creates a document with one chapter containing many sections,
+    such as a reference manual.
+
+    Args:
+        headings: The number of section headings in the document.
+    Returns:
+        A string of the Markdown document.
+    '''
+    sections = ['# Reference Manual\n']
+    for number in range(headings):
+        sections.append('## Section {}\n\nThe description of section {}.\n'.format(number, number))
+    return '\n'.join(sections)
+
+
+def benchmark_headings(headings, repeat):
+    '''Times converting a document with many headings, including
+    building its heading tree.
+
+    Args:
+        headings: The number of section headings in the document.
+        repeat: The number of times to convert the document.
+    Returns:
+        The shortest time in seconds taken to convert the document.
+    '''
+    converter = Verto()
+    text = reference_manual(headings)
+
+    def convert():
+        converter.clear_saved_data()
+        converter.convert(text)
+    return min(timeit.repeat(convert, number=1, repeat=repeat))
+
+
+def tagged_lesson(sections):
+    '''Creates a document where each section is made of tags, such as
+    a lesson with buttons, glossary links and boxed text.
+
+    Args:
+        sections: The number of sections in the document.
+    Returns:
+        A string of the Markdown document.
+    '''
+    lines = ['# Lesson\n']
+    for number in range(sections):
+        lines.append('## Activity {}\n'.format(number))
+        lines.append('{{button-link link="http://www.example.com/{}" text="Activity {}"}}\n'.format(number, number))
+        lines.append('{video url="https://www.youtube.com/watch?v=dQw4w9WgXcQ"}\n')
+        lines.append('{{boxed-text}}\n\nThe {{glossary-link term="algorithm"}}algorithm{{glossary-link end}} '
+                     'for activity {}.\n\n{{boxed-text end}}\n'.format(number))
+    return '\n'.join(lines)
+
+
+def benchmark_tags(sections, repeat):
+    '''Times converting a document made of tags.
+
+    Args:
+        sections: The number of sections in the document.
+        repeat: The number of times to convert the document.
+    Returns:
+        The shortest time in seconds taken to convert the document.
+    '''
+    converter = Verto()
+    text = tagged_lesson(sections)
+
+    def convert():
+        converter.clear_saved_data()
+        converter.convert(text)
+    return min(timeit.repeat(convert, number=1, repeat=repeat))
+
+
+def benchmark_tags_verbatim(sections, repeat):
+    '''Times converting a document made of tags, where the html of
+    templates is output as rendered.
+
+    Args:
+        sections: The number of sections in the document.
+        repeat: The number of times to convert the document.
+    Returns:
+        The shortest time in seconds taken to convert the document.
+    '''
+    converter = Verto(verbatim_templates=True)
+    text = tagged_lesson(sections)
+
+    def convert():
+        converter.clear_saved_data()
+        converter.convert(text)
+    return min(timeit.repeat(convert, number=1, repeat=repeat))
+
+
+def benchmark_tags_parse(sections, repeat):
+    '''Times parsing the html rendered by templates while converting a
+    document made of tags, which compared with the tags benchmark
+    shows the share of the conversion spent parsing.
+
+    Args:
+        sections: The number of sections in the document.
+        repeat: The number of times to convert the document.
+    Returns:
+        The shortest time in seconds spent parsing in a conversion.
+    '''
+    converter = Verto()
+    text = tagged_lesson(sections)
+    fromstring = HtmlParser.fromstring
+    durations = []
+
+    def timed_fromstring(html_string):
+        start = time.perf_counter()
+        try:
+            return fromstring(html_string)
+        finally:
+            durations.append(time.perf_counter() - start)
+
+    HtmlParser.fromstring = staticmethod(timed_fromstring)
+    try:
+        totals = []
+        for _ in range(repeat):
+            durations.clear()
+            converter.clear_saved_data()
+            converter.convert(text)
+            totals.append(sum(durations))
+    finally:
+        HtmlParser.fromstring = staticmethod(fromstring)
+    return min(totals)
+
+
+def repeated_tags(sections):
+    '''Creates a document where the same tags are repeated in each
+    section, such as the navigation and media of a course.
+
+    Args:
+        sections: The number of sections in the document.
+    Returns:
+        A string of the Markdown document.
+    '''
+    lines = []
+    for number in range(sections):
+        lines.append('{button-link link="http://www.example.com/" text="Next activity"}\n')
+        lines.append('{interactive slug="binary-cards" type="whole-page"}\n')
+        lines.append('{image file-path="img/logo.png" alt="Logo"}\n')
+        lines.append('{video url="https://www.youtube.com/watch?v=dQw4w9WgXcQ"}\n')
+        lines.append('The text of section {}.\n'.format(number))
+    return '\n'.join(lines)
+
+
+def benchmark_repeated(sections, repeat):
+    '''Times converting a document with repeated tags, which are
+    rendered once and then reused from the render cache.
+
+    Args:
+        sections: The number of sections in the document.
+        repeat: The number of times to convert the document.
+    Returns:
+        The shortest time in seconds taken to convert the document.
+    '''
+    converter = Verto()
+    text = repeated_tags(sections)
+
+    def convert():
+        converter.clear_saved_data()
+        converter.convert(text)
+    return min(timeit.repeat(convert, number=1, repeat=repeat))
+
+
+BENCHMARKS = [
+    ('scratch', benchmark_scratch),
+    ('list', benchmark_list),
+    ('headings', benchmark_headings),
+    ('tags', benchmark_tags),
+    ('tags-parse', benchmark_tags_parse),
+    ('tags-verbatim', benchmark_tags_verbatim),
+    ('repeated', benchmark_repeated),
+]
+
+
+def parse_args():
+    '''Parses the arguments for running the benchmarks.'''
+    opts = optparse.OptionParser(
+        usage='Run the command `python -m verto.tests.benchmark` from the level above the verto directory.',
+        description='Times the conversion of large documents, these are not run with the testing suite.')
+    opts.add_option(
+        '--sizes',
+        help='A comma separated list of the number of snippets or items in each benchmark document, '
+             'where several sizes show how the time scales with the size of the document.',
+        default='500,1000,2000'
+    )
+    opts.add_option(
+        '--repeat',
+        type='int',
+        help='The number of times to convert each benchmark document.',
+        default=5
+    )
+    options, arguments = opts.parse_args()
+    return options, arguments
+
+
+def main():
+    '''Runs the benchmarks named in the arguments, or all benchmarks
+    if none are named.
+    '''
+    options, arguments = parse_args()
+    sizes = [int(size) for size in options.sizes.split(',')]
+    for name, benchmark in BENCHMARKS:
+        if arguments and name not in arguments:
+            continue
+        for size in sizes:
+            seconds = benchmark(size, options.repeat)
+            print('{}: {:.3f}s for size {} ({:.1f}us each)'.format(name, seconds, size, seconds / size * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from verto.utils.UniqueSlugify import UniqueSlugify
+
+REQUIRED_FILE_TYPES = ('images', 'interactives', 'page_scripts', 'scratch_images')
+
+
+class ConversionContext(object):
+    ''' Holds the data created while converting, so that processors
+    do not store any state of a document themselves. A context is
+    created for each conversion, allowing a converter to be used by
+    multiple threads at once.
+
+    A context may also override the configuration of the extension for
+    a single conversion, where None uses the configuration of the
+    extension.
+    '''
+
+    def __init__(self, custom_slugify=None):
+        '''
+        Args:
+            custom_slugify: The UniqueSlugify to create slugs with, if
+                not given a new UniqueSlugify is used.
+        '''
+        self.custom_slugify = custom_slugify if custom_slugify is not None else UniqueSlugify()
+        self.processors = None
+        self.jinja_templates = None
+        self.processor_info = None
+        self.configuration = ''
+        self.glossary_terms = defaultdict(list)
+        self.required_files = defaultdict(set)
+        for file_type in REQUIRED_FILE_TYPES:
+            self.required_files[file_type] = set()
+        self.clear_document_data()
+
+    def clear_document_data(self):
+        ''' Clears information stored for a specific document.
+        '''
+        self.document_start = True
+        self.title = None
+        self.heading_tree = None
+        self.heading_roots = []
+        self.current_heading = None
+        self.level_generator = None
+
+    @property
+    def heading_tree(self):
+        '''The heading tree of the document as a tuple of HeadingNodes,
+        or None if the document has no headings. The tree is built from
+        the DynamicHeadingNodes in heading_roots when first read after
+        a heading is added, rather than for every heading.
+        '''
+        if self._heading_tree is None and self.heading_roots:
+            self._heading_tree = tuple(root.to_immutable() for root in self.heading_roots)
+        return self._heading_tree
+
+    @heading_tree.setter
+    def heading_tree(self, heading_tree):
+        self._heading_tree = heading_tree
+
+    @contextmanager
+    def recording_required_files(self):
+        '''Records the files required by processors until the with
+        statement is exited, where the files are also added to the
+        required files of the context.
+
+        Yields:
+            A dictionary of file types to sets of the files added.
+        '''
+        required_files = self.required_files
+        recorded_files = defaultdict(set)
+        self.required_files = recorded_files
+        try:
+            yield recorded_files
+        finally:
+            self.required_files = required_files
+            self.add_required_files(recorded_files)
+
+    def add_required_files(self, required_files):
+        '''
+        Args:
+            required_files: A dictionary of file types to sets of files
+                to add to the required files of the context.
+        '''
+        for file_type, files in required_files.items():
+            self.required_files[file_type].update(files)
+
+    def clear_saved_data(self):
+        ''' Clears information that is saved between documents.
+        '''
+        self.custom_slugify.clear()
+        self.glossary_terms.clear()
+        for key in self.required_files.keys():
+            self.required_files[key].clear()
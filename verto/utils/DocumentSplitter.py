@@ -0,0 +1,196 @@
+from markdown.preprocessors import ReferencePreprocessor
+from verto.processors.ConditionalProcessor import tag_starts_with
+from zlib import crc32
+import re
+
+HEADING_RE = re.compile(r'^#{1,6}(?!#)')
+FENCE_RE = re.compile(r'^ {0,3}(?P<fence>`{3,}|~{3,})')
+HTML_START_RE = re.compile(r'^<(?P<tag>[a-zA-Z][a-zA-Z0-9-]*)')
+VOID_ELEMENTS = frozenset({
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source', 'track', 'wbr'
+})
+INDENT = ('    ', '\t')
+HTML_COMMENT_START = '<!--'
+HTML_COMMENT_END = '-->'
+# Lines that may continue the block before them, even after a blank line
+CONTINUATION_RE = re.compile(r'^([ \t]|[*+-][ \t]|\d+\.[ \t]|>|:)')
+CONTAINER_PROCESSORS = ('blockquote', 'boxed-text', 'image-container', 'interactive-container', 'panel')
+
+MIN_SEGMENT_LINES = 20
+SEGMENT_BOUNDARY_MASK = 0x7
+# Extensions which need the whole document to be converted at once
+NON_INCREMENTAL_EXTENSIONS = ('abbr', 'footnotes', 'toc')
+
+
+class DocumentSplitter(object):
+    ''' Splits a Markdown document into segments which are converted
+    to the same HTML when converted separately and joined, as when the
+    whole document is converted. Segments only start at a top-level
+    block which cannot be part of the block before it, outside of
+    fenced code, raw HTML and container tags.
+
+    Segments always start at headings, and long sections are also split
+    at boundaries chosen by the content of the line, so an edit only
+    changes the segments around it.
+    '''
+
+    def __init__(self, processor_info, processors):
+        '''
+        Args:
+            processor_info: The processor information of the Verto
+                extension.
+            processors: A set of the enabled processor names.
+        '''
+        self.start_patterns = []
+        self.end_patterns = []
+        for processor in CONTAINER_PROCESSORS:
+            if processor not in processors:
+                continue
+            info = processor_info[processor]
+            tag_argument = info.get('tag_argument', processor)
+            if 'pattern' in info:
+                start_pattern = re.compile(info['pattern'])
+            else:
+                start_pattern = re.compile(r'^ *\{{{0} ?[^\}}]*(?<! end)\}} *$'.format(tag_argument))
+            self.start_patterns.append(start_pattern)
+            self.end_patterns.append(re.compile(r'^ *\{{{0} end\}} *$'.format(tag_argument)))
+        self.conditional_pattern = None
+        if 'conditional' in processors:
+            self.conditional_pattern = re.compile(processor_info['conditional']['pattern'])
+
+    def split(self, text):
+        '''
+        Args:
+            text: A string of Markdown text.
+        Returns:
+            A tuple of a list of segments, each a string of Markdown
+            text, and a string of the reference definitions of the
+            document, which must be given with each segment.
+        '''
+        references = []
+        segments = ['\n'.join(lines) for lines in self.split_lines(text.split('\n'), references)]
+        return segments, '\n'.join(references)
+
+    def split_lines(self, lines, references):
+        '''Splits the given lines into segments as they are read, so
+        the whole document does not need to be read at once.
+
+        Args:
+            lines: An iterable of strings of the lines of a Markdown
+                document, without newlines.
+            references: A list which the lines of reference definitions
+                are added to when they are read.
+        Returns:
+            A generator of lists of the lines of each segment.
+        '''
+        segment = []
+        depth = 0
+        fence = None
+        html_tag = None
+        html_depth = 0
+        in_comment = False
+        previous_blank = True
+        reference_title = False
+
+        for line in lines:
+            blank = line.strip() == ''
+            if reference_title and ReferencePreprocessor.TITLE_RE.match(line):
+                references.append(line)
+            reference_title = False
+
+            if (fence is None and not in_comment and html_tag is None and previous_blank and not blank and
+                    depth == 0 and segment and CONTINUATION_RE.match(line) is None):
+                if (HEADING_RE.match(line) is not None or (len(segment) >= MIN_SEGMENT_LINES and
+                                                           crc32(line.encode('utf-8')) & SEGMENT_BOUNDARY_MASK == 0)):
+                    yield segment
+                    segment = []
+            segment.append(line)
+
+            if fence is not None:
+                if line.strip().startswith(fence) and line.strip().strip(fence[0]) == '':
+                    fence = None
+                previous_blank = blank
+                continue
+            if in_comment:
+                in_comment = HTML_COMMENT_END not in line
+                previous_blank = blank
+                continue
+            if html_tag is not None:
+                html_depth += self.count_tags(html_tag, line)
+                if html_depth <= 0:
+                    html_tag = None
+                previous_blank = blank
+                continue
+
+            match = FENCE_RE.match(line)
+            if match is not None:
+                fence = match.group('fence')
+            elif previous_blank and line.startswith(HTML_COMMENT_START):
+                in_comment = HTML_COMMENT_END not in line
+            elif previous_blank and HTML_START_RE.match(line) is not None:
+                tag = HTML_START_RE.match(line).group('tag').lower()
+                if tag not in VOID_ELEMENTS:
+                    html_depth = self.count_tags(tag, line)
+                    if html_depth > 0:
+                        html_tag = tag
+            elif ReferencePreprocessor.RE.match(line) is not None:
+                references.append(line)
+                reference_title = True
+            elif '{' in line and not line.startswith(INDENT):
+                # Indented tags are within a list item or code block
+                depth = max(depth + self.container_depth_change(line), 0)
+            previous_blank = blank
+
+        yield segment
+
+    def container_depth_change(self, line):
+        '''
+        Args:
+            line: A string of a line of Markdown text.
+        Returns:
+            1 if the line starts a container, -1 if the line ends a
+            container, otherwise 0.
+        '''
+        for pattern in self.end_patterns:
+            if pattern.match(line):
+                return -1
+        for pattern in self.start_patterns:
+            if pattern.search(line):
+                return 1
+        if self.conditional_pattern is not None:
+            match = self.conditional_pattern.search(line)
+            if match is not None:
+                if tag_starts_with('if', match.group('args')):
+                    return 1
+                if tag_starts_with('end', match.group('args')):
+                    return -1
+        return 0
+
+    def count_tags(self, tag, line):
+        '''
+        Args:
+            tag: The name of a HTML tag.
+            line: A string of a line of HTML.
+        Returns:
+            The number of opening tags minus the number of closing
+            tags with the given name in the line.
+        '''
+        opening = len(re.findall(r'<{}(?=[\s/>])'.format(re.escape(tag)), line, re.IGNORECASE))
+        closing = len(re.findall(r'</{}\s*>'.format(re.escape(tag)), line, re.IGNORECASE))
+        self_closing = len(re.findall(r'<{}(?=[\s/])[^>]*/>'.format(re.escape(tag)), line, re.IGNORECASE))
+        return opening - closing - self_closing
+
+
+def supports_segments(extensions):
+    '''
+    Args:
+        extensions: A list of the extra extensions of a converter.
+    Returns:
+        False if an extension needs the whole document to be converted
+        at once, otherwise True.
+    '''
+    for extension in extensions:
+        name = extension if isinstance(extension, str) else type(extension).__module__
+        if name.split('.')[-1].split(':')[0] in NON_INCREMENTAL_EXTENSIONS:
+            return False
+    return True
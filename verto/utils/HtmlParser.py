@@ -1,6 +1,14 @@
 import html.parser
 from verto.errors.HtmlParseError import HtmlParseError
 from markdown.util import etree
+import re
+
+# Markup which the xml parser does not parse in the same way as the
+# html parser (declarations, processing instructions, script and style
+# content, namespaces, carriage returns and whitespace normalized in
+# attribute values)
+XML_INCOMPATIBLE_RE = re.compile(r'<(?:!(?!--)|\?|script|style)|xmlns|xml:|\r|=\s*(?:"[^"]*[\t\n]|\'[^\']*[\t\n])',
+                                 re.IGNORECASE)
 
 
 class HtmlParser(html.parser.HTMLParser):
@@ -8,15 +16,15 @@ class HtmlParser(html.parser.HTMLParser):
     is not defaultly supported by fromstring (XML only).
     '''
 
-    VOID_ELEMENTS = [
+    VOID_ELEMENTS = frozenset({
         'area', 'base', 'br', 'command', 'embed', 'hr', 'img', 'input',
-        'link', 'input', 'link', 'meta', 'param', 'source'
-    ]
+        'link', 'meta', 'param', 'source'
+    })
 
-    OPTIONALLY_CLOSE_ELEMENTS = [
+    OPTIONALLY_CLOSE_ELEMENTS = frozenset({
         'body', 'colgroup', 'dd', 'dt', 'head', 'html', 'li', 'optgroup',
         'option', 'p', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr'
-    ]
+    })
 
     def __init__(self, *args, **kwargs):
         '''Create a new parser.
@@ -26,6 +34,55 @@ class HtmlParser(html.parser.HTMLParser):
         self.closed = False
         self.stack = []
 
+    @staticmethod
+    def fromstring(html_string):
+        '''Converts a string of HTML into an ElementTree. Well-formed
+        HTML (such as the output of most templates) is parsed with
+        the faster XML parser, otherwise this parser is used.
+
+        Args:
+            html_string: A string of HTML with a single root element.
+        Returns:
+            An etree Element of the root node.
+        Raises:
+            HtmlParseError: If the HTML cannot be parsed.
+        '''
+        root = HtmlParser.fromstring_xml(html_string)
+        if root is None:
+            root = HtmlParser().feed(html_string).close().get_root()
+        return root
+
+    @staticmethod
+    def fromstring_xml(html_string):
+        '''
+        Args:
+            html_string: A string of HTML with a single root element.
+        Returns:
+            An etree Element of the root node, or None if the XML
+            parser would not give the same tree as this parser.
+        '''
+        if XML_INCOMPATIBLE_RE.search(html_string) is not None:
+            return None
+        # Comments outside of the root node are not kept by the XML parser
+        stripped = html_string.strip()
+        if stripped.startswith('<!--') or stripped.endswith('-->'):
+            return None
+        parser = etree.XMLParser(target=etree.TreeBuilder(insert_comments=True))
+        try:
+            parser.feed(html_string)
+            root = parser.close()
+        except etree.ParseError:
+            return None
+        # Names of tags and attributes are lowercase in HTML
+        for element in root.iter():
+            tag = element.tag
+            if tag is not etree.Comment and tag != tag.lower():
+                return None
+            for name in element.attrib:
+                if name != name.lower():
+                    return None
+        return root
+
     def get_root(self):
         '''Gets the root element after parsing.
 
@@ -151,11 +208,12 @@ class HtmlParser(html.parser.HTMLParser):
                 line, pos = self.getpos()
                 raise HtmlParseError(line, pos, "Data outside of the HTML tree.")
         else:
-            sibling = list(self.stack[-1])[-1] if list(self.stack[-1]) else None
-            if sibling is not None:
+            parent = self.stack[-1]
+            if len(parent) > 0:
+                sibling = parent[-1]
                 sibling.tail = (sibling.tail or '') + data
             else:
-                self.stack[-1].text = (self.stack[-1].text or '') + data
+                parent.text = (parent.text or '') + data
 
     def handle_comment(self, data):
         '''This method is called when a comment is encountered
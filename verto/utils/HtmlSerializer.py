@@ -1,4 +1,5 @@
 from markdown.util import etree
+import io
 import re
 
 
@@ -8,6 +9,7 @@ class HtmlSerializer(object):
     '''
 
     COMMENT_PATTERN = r'<!--(?P<start_condition>.*?)&gt;(?P<content>.*?)&lt;!(?P<end_condition>.*?)-->'
+    COMMENT_RE = re.compile(COMMENT_PATTERN, re.DOTALL)
 
     @staticmethod
     def tostring(root):
@@ -19,11 +21,47 @@ class HtmlSerializer(object):
             A string of the serialized HTML tree.
         '''
         string = etree.tostring(root, encoding='unicode', method='html')
+        return HtmlSerializer.unescape_comments(string)
+
+    @staticmethod
+    def tostrings(elements):
+        '''Converts a list of sibling etrees into a single string,
+        serializing each into the same buffer.
+
+        Args:
+            elements: A list of Elements from the ElementTree library.
+        Returns:
+            A string of the serialized HTML trees, including their tails.
+        '''
+        buffer = io.StringIO()
+        ends = []
+        for element in elements:
+            etree.ElementTree(element).write(buffer, encoding='unicode', method='html')
+            ends.append(buffer.tell())
+        string = buffer.getvalue()
+        if '<!--' not in string:
+            return string
+        # Comments are unescaped within each tree, as with tostring
+        starts = [0] + ends[:-1]
+        return ''.join(HtmlSerializer.unescape_comments(string[start:end]) for start, end in zip(starts, ends))
+
+    @staticmethod
+    def unescape_comments(string):
+        '''Unescapes the brackets of conditional comments
+        (e.g. <!--[if IE]><p>Text</p><![endif]-->), which are escaped
+        by the ElementTree serializer.
+
+        Args:
+            string: A string of serialized HTML.
+        Returns:
+            The string with the conditional comments unescaped.
+        '''
+        if '<!--' not in string:
+            return string
 
         def unescape_comment(matchobj):
             return r'<!--{}>{}<!{}-->'.format(
                 matchobj.group('start_condition'),
                 matchobj.group('content'),
                 matchobj.group('end_condition'))
-        string = re.sub(HtmlSerializer.COMMENT_PATTERN, unescape_comment, string, flags=re.DOTALL)
-        return string
+        return HtmlSerializer.COMMENT_RE.sub(unescape_comment, string)
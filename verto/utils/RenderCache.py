@@ -0,0 +1,101 @@
+from collections import namedtuple, OrderedDict
+from verto.utils.HtmlParser import HtmlParser
+import copy
+import threading
+
+MAX_CACHED_FRAGMENTS = 1024
+
+RenderCacheInfo = namedtuple('RenderCacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class RenderedFragment(object):
+    ''' The html rendered for a tag, and the files the tag requires.
+    The html is parsed when first needed, and each use is given its
+    own copy of the parsed html, as the document tree is changed by
+    later processors.
+    '''
+
+    def __init__(self, html_string, required_files):
+        '''
+        Args:
+            html_string: A string of the rendered html.
+            required_files: A dictionary of file types to sets of files
+                added to the required files when rendering the tag.
+        '''
+        self.html_string = html_string
+        self.required_files = {file_type: frozenset(files) for file_type, files in required_files.items()}
+        self.root = None
+
+    def element(self):
+        '''
+        Returns:
+            A new copy of the etree Element of the parsed html.
+        '''
+        root = self.root
+        if root is None:
+            root = self.root = HtmlParser.fromstring(self.html_string)
+        return copy.deepcopy(root)
+
+
+class RenderCache(object):
+    ''' A cache of the fragments rendered for tags, shared between
+    documents converted by an extension, where the least recently used
+    fragments are removed when the cache is full.
+    '''
+
+    def __init__(self, max_size=MAX_CACHED_FRAGMENTS):
+        '''
+        Args:
+            max_size: The maximum number of fragments to keep.
+        '''
+        self.max_size = max_size
+        self.fragments = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        '''
+        Args:
+            key: A hashable key identifying the tag and configuration
+                it is rendered with.
+        Returns:
+            The RenderedFragment of the key, or None if not cached.
+        '''
+        with self.lock:
+            fragment = self.fragments.get(key)
+            if fragment is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.fragments.move_to_end(key)
+            return fragment
+
+    def add(self, key, fragment):
+        '''
+        Args:
+            key: A hashable key identifying the tag and configuration
+                it is rendered with.
+            fragment: The RenderedFragment of the key.
+        '''
+        with self.lock:
+            self.fragments[key] = fragment
+            while len(self.fragments) > self.max_size:
+                self.fragments.popitem(last=False)
+
+    def cache_info(self):
+        '''
+        Returns:
+            A RenderCacheInfo of the hits, misses, maximum size and
+            current size of the cache.
+        '''
+        with self.lock:
+            return RenderCacheInfo(self.hits, self.misses, self.max_size, len(self.fragments))
+
+    def clear(self):
+        '''Removes all fragments and resets the statistics.
+        '''
+        with self.lock:
+            self.fragments.clear()
+            self.hits = 0
+            self.misses = 0
@@ -0,0 +1,173 @@
+from hashlib import sha256
+import os
+import pickle
+import tempfile
+import time
+
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+ENTRY_SUFFIX = '.pickle'
+TEMP_SUFFIX = '.tmp'
+SIZE_CHECK_WRITES = 64
+SIZE_CHECK_SECONDS = 60
+TEMP_FILE_GRACE_SECONDS = 3600
+
+
+class ResultCache(object):
+    ''' An on-disk cache of conversion results, where each entry is
+    stored in its own file named by a hash of the document and
+    converter configuration. Entries are written atomically, so the
+    cache can be shared by multiple processes. Each process only knows
+    the size of its own writes, so the size of the directory is checked
+    every SIZE_CHECK_WRITES writes or SIZE_CHECK_SECONDS seconds, and
+    the cache may exceed the maximum size by the writes in between.
+    Entries are pickled, so the cache directory must only be writable
+    by trusted users.
+    '''
+
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        '''
+        Args:
+            directory: The path of the directory to store entries in,
+                which is created if it does not exist.
+            max_size: The maximum total size in bytes of all entries,
+                after which the least recently used entries are removed.
+        '''
+        self.directory = os.fspath(directory)
+        self.max_size = int(max_size)
+        self.size = None
+        self.size_checked_at = None
+        self.writes_since_size_check = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def __getstate__(self):
+        '''Returns the state of the cache for pickling, the size of
+        the cache is recalculated by each process.
+        '''
+        return {'directory': self.directory, 'max_size': self.max_size}
+
+    def __setstate__(self, state):
+        self.__init__(state['directory'], state['max_size'])
+
+    @staticmethod
+    def key(*parts):
+        '''
+        Args:
+            parts: Strings which together identify an entry.
+        Returns:
+            A string of the hexadecimal digest of the given strings.
+        '''
+        digest = sha256()
+        for part in parts:
+            encoded = part.encode('utf-8')
+            digest.update(str(len(encoded)).encode('ascii'))
+            digest.update(b':')
+            digest.update(encoded)
+        return digest.hexdigest()
+
+    def get(self, key):
+        '''
+        Args:
+            key: A string of the key of the entry.
+        Returns:
+            The stored entry, or None if the entry does not exist or
+            cannot be read.
+        '''
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Corrupted or incompatible entries are treated as missing
+            self._remove(path)
+            return None
+        return entry
+
+    def set(self, key, entry):
+        '''Stores the given entry, replacing any existing entry with
+        the same key.
+
+        Args:
+            key: A string of the key of the entry.
+            entry: A picklable object to store.
+        '''
+        data = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_size:
+            return
+        path = self._path(key)
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.directory, suffix=TEMP_SUFFIX)
+        try:
+            with os.fdopen(file_descriptor, 'wb') as f:
+                f.write(data)
+            try:
+                replaced_size = os.stat(path).st_size
+            except FileNotFoundError:
+                replaced_size = 0
+            os.replace(temp_path, path)
+        except OSError:
+            self._remove(temp_path)
+            return
+
+        self.writes_since_size_check += 1
+        if self.size is not None:
+            self.size += len(data) - replaced_size
+        if (self.size is None or self.size > self.max_size
+                or self.writes_since_size_check >= SIZE_CHECK_WRITES
+                or time.monotonic() - self.size_checked_at >= SIZE_CHECK_SECONDS):
+            self.evict()
+
+    def evict(self):
+        '''Removes the least recently used entries until the total size
+        of entries is within the maximum size, and removes temporary
+        files left by interrupted writes.
+        '''
+        entries = []
+        stale_time = time.time() - TEMP_FILE_GRACE_SECONDS
+        for name in os.listdir(self.directory):
+            if not name.endswith((ENTRY_SUFFIX, TEMP_SUFFIX)):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if name.endswith(TEMP_SUFFIX):
+                # Recent temporary files may still be written by another process
+                if stat.st_mtime < stale_time:
+                    self._remove(path)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        size = sum(entry_size for _, entry_size, _ in entries)
+        entries.sort()
+        for _, entry_size, path in entries:
+            if size <= self.max_size:
+                break
+            self._remove(path)
+            size -= entry_size
+        self.size = size
+        self.size_checked_at = time.monotonic()
+        self.writes_since_size_check = 0
+
+    def clear(self):
+        '''Removes all entries from the cache.
+        '''
+        for name in os.listdir(self.directory):
+            if name.endswith(ENTRY_SUFFIX):
+                self._remove(os.path.join(self.directory, name))
+        self.size = 0
+        self.size_checked_at = time.monotonic()
+        self.writes_since_size_check = 0
+
+    def _path(self, key):
+        '''Returns the path of the file for the given key.'''
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def _remove(self, path):
+        '''Removes the given file, if another process has not already.'''
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,109 @@
+from collections import OrderedDict
+from hashlib import sha256
+from jinja2 import Environment, PackageLoader, select_autoescape
+from os import listdir
+import os.path
+import re
+import threading
+
+MAX_CUSTOM_TEMPLATES = 1024
+
+
+class TemplateRegistry(object):
+    ''' Compiles HTML templates once per process, so they can be shared
+    by all converters. Default templates are compiled when first needed,
+    and custom templates are cached by a hash of their content, with the
+    least recently used custom templates removed when the cache is full.
+    Compiled templates are thread-safe to render.
+    '''
+
+    def __init__(self, max_custom_templates=MAX_CUSTOM_TEMPLATES):
+        '''
+        Args:
+            max_custom_templates: The maximum number of compiled custom
+                templates to keep.
+        '''
+        self.max_custom_templates = max_custom_templates
+        self.environment = Environment(
+            loader=PackageLoader('verto', 'html-templates'),
+            autoescape=select_autoescape(['html'])
+        )
+        self.default_templates = None
+        self.custom_templates = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_templates(self, custom_templates={}):
+        '''Returns compiled templates for each default template, where
+        a custom template is used instead of the default template if given.
+
+        Args:
+            custom_templates: A dictionary of template names to strings
+                of custom templates.
+        Returns:
+            A new dictionary of template names to compiled templates.
+        '''
+        templates = dict(self.get_default_templates())
+        for name, template_string in custom_templates.items():
+            if name in templates:
+                templates[name] = self.get_custom_template(template_string)
+        return templates
+
+    def get_default_templates(self):
+        '''Returns the compiled default templates, compiling them if
+        this is the first call.
+
+        Returns:
+            A dictionary of template names to compiled templates, which
+            must not be modified.
+        '''
+        default_templates = self.default_templates
+        if default_templates is None:
+            with self.lock:
+                if self.default_templates is None:
+                    self.default_templates = self.load_default_templates()
+                default_templates = self.default_templates
+        return default_templates
+
+    def load_default_templates(self):
+        '''Compiles the templates in the templates directory.
+
+        Returns:
+            A dictionary of template names to compiled templates.
+        '''
+        templates = {}
+        template_directory = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'html-templates')
+        for file in listdir(template_directory):
+            html_file = re.search(r'(.*?).html$', file)
+            if html_file:
+                templates[html_file.groups()[0]] = self.environment.get_template(file)
+        return templates
+
+    def get_custom_template(self, template_string):
+        '''
+        Args:
+            template_string: A string of a custom template.
+        Returns:
+            The compiled template.
+        '''
+        key = sha256(template_string.encode('utf-8')).digest()
+        with self.lock:
+            template = self.custom_templates.get(key)
+            if template is not None:
+                self.custom_templates.move_to_end(key)
+                return template
+
+        template = self.environment.from_string(template_string)
+        with self.lock:
+            self.custom_templates[key] = template
+            while len(self.custom_templates) > self.max_custom_templates:
+                self.custom_templates.popitem(last=False)
+        return template
+
+    def clear(self):
+        '''Removes all compiled templates.'''
+        with self.lock:
+            self.default_templates = None
+            self.custom_templates.clear()
+
+
+template_registry = TemplateRegistry()
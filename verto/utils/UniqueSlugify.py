@@ -1,6 +1,9 @@
 from slugify import slugify
+from functools import lru_cache
 from math import log10, floor
 
+MAX_CACHED_SLUGS = 4096
+
 
 class UniqueSlugify(object):
     ''' Wrapper for the python-slugify library enforcing unique slugs
@@ -9,13 +12,16 @@ class UniqueSlugify(object):
 
     def __init__(self, uids=set(), occurance_separator='-', entities=True,
                  decimal=True, hexadecimal=True, max_length=0, word_boundary=False,
-                 separator='-', save_order=False, stopwords=()):
+                 separator='-', save_order=False, stopwords=(), parent=None):
                     '''
                     Args:
                         uids: A set of strings which are already taken as slugs.
+                        parent: A UniqueSlugify whose slugs are also treated
+                            as taken.
                         Others: Passed directly to slugify.
                     '''
                     self.uids = set(uids)
+                    self.parent = parent
                     self.occurance_separator = str(occurance_separator)
                     self.entities = bool(entities)
                     self.decimal = bool(decimal)
@@ -25,6 +31,7 @@ class UniqueSlugify(object):
                     self.separator = str(separator)
                     self.save_order = bool(save_order)
                     self.stopwords = tuple(stopwords)
+                    self.next_counts = {}
 
     def __call__(self, text):
         '''
@@ -33,27 +40,84 @@ class UniqueSlugify(object):
         Returns:
             A string which is a slug (as specified by slugify) that is unique.
         '''
-        slug = slugify(text=text,
-                       entities=self.entities,
-                       decimal=self.decimal,
-                       hexadecimal=self.hexadecimal,
-                       max_length=self.max_length,
-                       word_boundary=self.word_boundary,
-                       separator=self.separator,
-                       save_order=self.save_order,
-                       stopwords=self.stopwords)
-        count = 1
-        new_slug = slug
-        while new_slug in self.uids:
+        slug = cached_slugify(text,
+                              self.entities,
+                              self.decimal,
+                              self.hexadecimal,
+                              self.max_length,
+                              self.word_boundary,
+                              self.separator,
+                              self.save_order,
+                              self.stopwords)
+        # Slugs are never freed until cleared, so counts before the
+        # count of the last slug made from this slug are still taken
+        count = self.next_counts.get(slug, 1)
+        new_slug = self.numbered_slug(slug, count)
+        while new_slug in self:
             count += 1
-            end_index = len(slug)
-            if self.max_length and (len(slug) +
-               len(self.occurance_separator) + floor(log10(count))) >= self.max_length:
-                end_index = self.max_length - floor(log10(count)) - len(self.occurance_separator) - 1
-            new_slug = '{0}{1}{2}'.format(slug[:end_index], self.occurance_separator, count)
+            new_slug = self.numbered_slug(slug, count)
+        self.next_counts[slug] = count + 1
         self.uids.add(new_slug)
         return new_slug
 
+    def numbered_slug(self, slug, count):
+        '''
+        Args:
+            slug: A string of a slug.
+            count: The number of the occurance of the slug, starting
+                from 1.
+        Returns:
+            A string of the slug with the occurance number appended
+            if it is not the first occurance, shortened to fit the
+            maximum length.
+        '''
+        if count == 1:
+            return slug
+        end_index = len(slug)
+        if self.max_length and (len(slug) +
+           len(self.occurance_separator) + floor(log10(count))) >= self.max_length:
+            end_index = self.max_length - floor(log10(count)) - len(self.occurance_separator) - 1
+        return '{0}{1}{2}'.format(slug[:end_index], self.occurance_separator, count)
+
+    @staticmethod
+    def cache_info():
+        '''
+        Returns:
+            A named tuple of the hits, misses, maximum size and current
+            size of the cache of slugs, which is shared by all
+            UniqueSlugify objects.
+        '''
+        return cached_slugify.cache_info()
+
+    def __contains__(self, uid):
+        '''
+        Args:
+            uid: A string of a slug.
+        Returns:
+            True if the slug is taken by this object or its parent.
+        '''
+        return uid in self.uids or (self.parent is not None and uid in self.parent)
+
+    def spawn(self):
+        '''
+        Creates a UniqueSlugify with the same settings, which treats
+        the slugs of this object as taken without adding to them. (Useful
+        to create slugs for a document without changing the saved slugs
+        until the document is finished).
+        Returns:
+            A new UniqueSlugify with this object as its parent.
+        '''
+        return UniqueSlugify(occurance_separator=self.occurance_separator,
+                             entities=self.entities,
+                             decimal=self.decimal,
+                             hexadecimal=self.hexadecimal,
+                             max_length=self.max_length,
+                             word_boundary=self.word_boundary,
+                             separator=self.separator,
+                             save_order=self.save_order,
+                             stopwords=self.stopwords,
+                             parent=self)
+
     def add_uid(self, uid):
         '''
         Adds an externally used slug. (Useful to re-add a slug after a
@@ -77,3 +141,26 @@ class UniqueSlugify(object):
         Clears the known slugs used for uniqueness comparisons.
         '''
         self.uids = set()
+        self.next_counts = {}
+
+
+@lru_cache(maxsize=MAX_CACHED_SLUGS)
+def cached_slugify(text, entities, decimal, hexadecimal, max_length, word_boundary, separator, save_order, stopwords):
+    '''Returns the slug of the given text, which is cached as headings
+    and glossary terms are often repeated between documents.
+
+    Args:
+        text: A string to be turned into a slug.
+        Others: Passed directly to slugify.
+    Returns:
+        A string which is a slug (as specified by slugify).
+    '''
+    return slugify(text=text,
+                   entities=entities,
+                   decimal=decimal,
+                   hexadecimal=hexadecimal,
+                   max_length=max_length,
+                   word_boundary=word_boundary,
+                   separator=separator,
+                   save_order=save_order,
+                   stopwords=stopwords)
@@ -42,39 +42,71 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import re
 from markdown.blockprocessors import OListProcessor as DefaultOListProcessor
-from markdown.util import string_type, etree
+from markdown.postprocessors import RawHtmlPostprocessor as DefaultRawHtmlPostprocessor
+from markdown.util import etree, HTML_PLACEHOLDER
 
 BLOCK_LEVEL_ELEMENTS = [
     'address', 'article', 'aside', 'blockqoute', 'br', 'canvas', 'dd', 'div',
     'dl', 'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h[1-6]',
     'header', 'hr', 'li', 'main', 'nav', 'noscript', 'ol', 'output', 'p',
     'pre', 'section', 'table', 'tfoot', 'ul', 'video', 'remove'
-]  # TODO: TO MAKE CONFIGURABLE
+]
+TAG_RE = re.compile(r'^\<\/?([^ >]+)')
+# Element names which are matched by lookup rather than as a pattern
+ELEMENT_NAME_RE = re.compile(r'[\w-]+')
+INTEGER_RE = re.compile(r'(\d+)')
+# The placeholder of a stashed block of html, which may be the only
+# content of a paragraph
+STASH_PLACEHOLDER = re.escape(HTML_PLACEHOLDER).replace('%s', r'(\d+)')
+STASH_PLACEHOLDER_RE = re.compile('<p>{0}</p>|{0}'.format(STASH_PLACEHOLDER))
 
 
-def is_block_level(html, block_level_elements):
+class BlockLevelClassifier(object):
+    '''Checks if the root element of html is a block level element.
+    Used to override the check of the markdown raw html postprocessor,
+    and built once per extension as it is run for every stashed block
+    of html in every document.
     '''
-    Checks if the root element (or first element) of the given
-    html is a block level element.
-    Args:
-        html: A string of the html to check.
-        block_level_elements: A list of strings which are the
-        block level elements.
-    Returns:
-        True if the first element is a block level element.
-    '''
-    m = re.match(r'^\<\/?([^ >]+)', html)
-    if m:
+
+    def __init__(self, block_level_elements=BLOCK_LEVEL_ELEMENTS):
+        '''
+        Args:
+            block_level_elements: A list of strings which are the names
+                of block level elements, or regular expressions matching
+                names of block level elements (e.g. 'h[1-6]').
+        '''
+        self.block_level_elements = list(block_level_elements)
+        names = set()
+        patterns = []
+        for element in self.block_level_elements:
+            if ELEMENT_NAME_RE.fullmatch(element):
+                names.add(element.lower())
+            else:
+                patterns.append(element)
+        self.names = frozenset(names)
+        self.pattern = None
+        if patterns:
+            self.pattern = re.compile('|'.join(patterns), re.IGNORECASE)
+
+    def __call__(self, html):
+        '''
+        Args:
+            html: A string of the html to check.
+        Returns:
+            True if the first element is a block level element.
+        '''
+        m = TAG_RE.match(html)
+        if m is None:
+            return False
         tag = m.group(1)
         if tag[0] in ('!', '?', '@', '%'):
             return True
-        if isinstance(tag, string_type):
-            elements = '|'.join(block_level_elements)
-            block_elements_re = re.compile('^({})$'.format(elements),
-                                           re.IGNORECASE)
-            return block_elements_re.match(tag)
-        return False
-    return False
+        # A newline may follow the name of an element before its end
+        if tag.endswith('\n'):
+            tag = tag[:-1]
+        if tag.lower() in self.names:
+            return True
+        return self.pattern is not None and self.pattern.fullmatch(tag) is not None
 
 
 class OListProcessor(DefaultOListProcessor):
@@ -127,43 +159,41 @@ class OListProcessor(DefaultOListProcessor):
 
         Args:
             blocks: The blocks from which to draw the list from.
+        Returns:
+            A tuple of whether the list is tight, and a list of the
+            lists of blocks of each item.
         '''
         relevant_block_groups = []
-        while len(blocks) > 0:
-            block = blocks.pop(0)
+        index = 0
+        while index < len(blocks):
+            block = blocks[index]
             match = self.RE.match(block)
             if match is not None:
                 relevant_block_groups.append([])
             elif not (block.startswith(' ' * self.tab_length) or block.strip() == ''):
-                blocks.insert(0, block)
                 break
             relevant_block_groups[-1].append(block)
-        is_tight = len(list(filter(None, relevant_block_groups))) == 1
+            index += 1
+        del blocks[:index]
+        is_tight = len(relevant_block_groups) == 1
 
+        # Blocks of each item are kept as lists of lines until joined
         item_groups = []
         for block_group in relevant_block_groups:
-            if len(block_group) <= 0:
-                continue
-
-            block = block_group.pop(0)
-            for line in block.split('\n'):
+            for line in block_group[0].split('\n'):
                 match = self.CHILD_RE.match(line)
                 if match is not None:
                     if not item_groups and self.TAG == 'ol':
-                        INTEGER_RE = re.compile('(\d+)')
                         self.STARTSWITH = INTEGER_RE.match(match.group(1)).group()
-                    item_groups.append([match.group(3)])
-                elif (self.INDENT_RE.match(line) and not self.INDENT_CONT_RE.match(item_groups[-1][-1])):
-                    item_groups[-1].append(self.looseDetab(line))
-                elif self.INDENT_RE.match(line):
-                    item_groups[-1][-1] = '{}\n{}'.format(item_groups[-1][-1], self.looseDetab(line))
+                    item_groups.append([[match.group(3)]])
+                elif (self.INDENT_RE.match(line) and not self.INDENT_CONT_RE.match(item_groups[-1][-1][0])):
+                    item_groups[-1].append([self.looseDetab(line)])
                 else:
-                    item_groups[-1][-1] = '{}\n{}'.format(item_groups[-1][-1], self.looseDetab(line))
-            for block in block_group:
-                block = self.looseDetab(block)
-                item_groups[-1].append(block)
+                    item_groups[-1][-1].append(self.looseDetab(line))
+            for block in block_group[1:]:
+                item_groups[-1].append([self.looseDetab(block)])
 
-        return is_tight, item_groups
+        return is_tight, [['\n'.join(lines) for lines in item_group] for item_group in item_groups]
 
 
 class UListProcessor(OListProcessor):
@@ -183,3 +213,51 @@ class UListProcessor(OListProcessor):
         # Detect an item (``1. item``). ``group(1)`` contains contents of item.
         self.RE = re.compile(r'^[ ]{0,%d}[*+-][ ]+(.*)' % (self.tab_length - 1))
         self.CHILD_RE = re.compile(r'^[ ]{0,%d}(([*+-]))[ ]+(.*)' % (self.tab_length - 1))
+
+
+class RawHtmlPostprocessor(DefaultRawHtmlPostprocessor):
+    '''Restores raw html to the document. Overrides the built-in
+    markdown `RawHtmlPostprocessor`, which searches for the placeholder
+    of every stashed block of html at every position of the document,
+    by finding all placeholders in a single pass and looking up their
+    html by index.
+    '''
+
+    def run(self, text):
+        '''
+        Args:
+            text: A string of the document.
+        Returns:
+            The document with the placeholders replaced by their html.
+        '''
+        if self.markdown.htmlStash.html_counter == 0:
+            return text
+        return STASH_PLACEHOLDER_RE.sub(self.replace, text)
+
+    def replace(self, match):
+        '''
+        Args:
+            match: The match of a placeholder, which may be wrapped in
+                a paragraph.
+        Returns:
+            The html of the placeholder, where block level html is not
+            wrapped in a paragraph.
+        '''
+        in_paragraph = match.group(1) is not None
+        index = int(match.group(1) if in_paragraph else match.group(2))
+        if index >= self.markdown.htmlStash.html_counter:
+            return match.group()
+
+        html, safe = self.markdown.htmlStash.rawHtmlBlocks[index]
+        if self.markdown.safeMode and not safe:
+            if str(self.markdown.safeMode).lower() == 'escape':
+                html = self.escape(html)
+            elif str(self.markdown.safeMode).lower() == 'remove':
+                html = ''
+            else:
+                html = self.markdown.html_replacement_text
+        if not in_paragraph:
+            return html
+        if self.isblocklevel(html) and (safe or not self.markdown.safeMode):
+            return html + '\n'
+        return '<p>' + html + '</p>'